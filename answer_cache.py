@@ -0,0 +1,134 @@
+import logging
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_PATH, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL
+from metrics import metrics
+from retrieval import normalize
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerCache:
+    """Semantic cache of query-intent replies, persisted in SQLite.
+
+    A question is answered from the cache when its embedding has cosine
+    similarity >= threshold with a previously answered one. Entries expire
+    after ttl seconds and are dropped as soon as the policy vector store
+    version changes, since the answers are grounded in its contents.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._version = None
+        self._loaded = False
+        self._ids = []
+        self._vectors = []
+        self._answers = []
+        self._created = []
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS answer_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                store_version TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def _sync(self, version, now):
+        """Load entries for version; entries of any other store version are deleted."""
+        version = version or ""
+        if self._loaded and version == self._version:
+            return
+        deleted = self._db.execute("DELETE FROM answer_cache WHERE store_version != ?", (version,)).rowcount
+        if deleted:
+            self._stats["invalidations"] += deleted
+            logger.info(f"Policy store is now {version or 'unversioned'}; dropped {deleted} cached answer(s)")
+        rows = self._db.execute(
+            "SELECT id, vector, answer, created_at FROM answer_cache WHERE store_version = ? ORDER BY id",
+            (version,)
+        ).fetchall()
+        self._db.commit()
+        self._ids = [row[0] for row in rows]
+        self._vectors = [np.frombuffer(row[1], dtype=np.float32) for row in rows]
+        self._answers = [row[2] for row in rows]
+        self._created = [row[3] for row in rows]
+        self._version = version
+        self._loaded = True
+        self._expire(now)
+
+    def _expire(self, now):
+        if self.ttl is None:
+            return
+        stale = 0
+        while stale < len(self._created) and now - self._created[stale] > self.ttl:
+            stale += 1
+        if stale:
+            self._db.execute("DELETE FROM answer_cache WHERE id <= ?", (self._ids[stale - 1],))
+            self._db.commit()
+            self._drop(stale)
+
+    def _drop(self, count):
+        del self._ids[:count], self._vectors[:count], self._answers[:count], self._created[:count]
+
+    def lookup(self, vector, version):
+        now = time.time()
+        vector = normalize(vector)
+        with self._lock:
+            self._sync(version, now)
+            self._expire(now)
+            if self._vectors:
+                scores = np.stack(self._vectors) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._stats["hits"] += 1
+                    metrics.incr("answer_cache_hits")
+                    return self._answers[best]
+            self._stats["misses"] += 1
+            return None
+
+    def add(self, vector, answer, version):
+        now = time.time()
+        vector = normalize(vector)
+        with self._lock:
+            self._sync(version, now)
+            entry_id = self._db.execute(
+                "INSERT INTO answer_cache (store_version, vector, answer, created_at) VALUES (?, ?, ?, ?)",
+                (self._version, vector.tobytes(), answer, now)
+            ).lastrowid
+            self._ids.append(entry_id)
+            self._vectors.append(vector)
+            self._answers.append(answer)
+            self._created.append(now)
+            overflow = len(self._ids) - self.max_entries
+            if overflow > 0:
+                self._db.execute("DELETE FROM answer_cache WHERE id <= ?", (self._ids[overflow - 1],))
+                self._drop(overflow)
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM answer_cache")
+            self._db.commit()
+            self._drop(len(self._ids))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._ids)
+            stats["store_version"] = self._version
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -1,125 +1,158 @@
-import streamlit as st
-import time
-import pandas as pd
-from insurance_test import process_claims, process_jira_updates
-import requests
-
-st.set_page_config(
-    page_title="Insurance Claim Engine",
-    layout="wide"
-)
-
-
-if "running" not in st.session_state:
-    st.session_state.running = False
-if "last_results" not in st.session_state:
-    st.session_state.last_results = []
-if "logs" not in st.session_state:
-    st.session_state.logs = []
-
-
-st.markdown("""
-<h1 style='text-align:center; color:#2E86C1;'>Insurance Claim Processing Engine</h1>
-<p style='text-align:center; color:gray;'>
-Automatically process email-based insurance claims and Jira updates every 5 minutes.
-</p>
-""", unsafe_allow_html=True)
-
-st.divider()
-col1, col2, col3 = st.columns([1, 1, 3])
-
-with col1:
-    if st.button("Start Batch Job", type="primary"):
-        st.session_state.running = True
-        st.session_state.logs = []
-        st.session_state.last_results = []
-        st.rerun()
-
-with col2:
-    if st.button("Stop Batch Job", type="secondary"):
-        st.session_state.running = False
-        st.rerun()
-
-with col3:
-    st.markdown(
-        f"""
-        <div style="background-color:#F4F6F6; border-radius:10px; padding:10px; text-align:center;">
-        <b>Status:</b> {"<span style='color:green;'>Running</span>" if st.session_state.running else "<span style='color:red;'>Stopped</span>"}
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-
-st.divider()
-
-
-if st.session_state.running:
-    with st.spinner("Running batch job, please wait..."):
-        start_time = time.time()
-        logs = []
-        all_results = []
-
-        for attempt in range(3):
-            try:
-                results = process_claims()  
-                logs.append(f"Claims processed: {len(results)}")
-                all_results.extend(results)
-                break
-            except requests.exceptions.ReadTimeout:
-                logs.append(f"Timeout processing claims, retry {attempt+1}/3")
-                time.sleep(5)
-            except requests.exceptions.ConnectionError:
-                logs.append(f"Connection error processing claims, retry {attempt+1}/3")
-                time.sleep(5)
-            except Exception as e:
-                logs.append(f"Unexpected error in claims: {e}")
-                results = []
-                break
-
-       
-        try:
-            jira_results = process_jira_updates()  
-            all_results.extend(jira_results)
-            logs.append("Jira updates processed and customer emails sent")
-        except Exception as e:
-            logs.append(f"Error processing Jira updates: {e}")
-
-        end_time = time.time()
-        st.session_state.last_results = all_results
-        st.session_state.logs.extend(logs)
-
-        st.success(f"Batch completed in {end_time - start_time:.2f} seconds.")
-
-        
-        st.subheader("Batch Logs")
-        for log in logs:
-            st.write(f"- {log}")
-
-       
-        if all_results:
-            st.subheader("Processed Emails and Status")
-            df = pd.DataFrame(all_results)
-            st.dataframe(df, width="stretch")
-            st.caption(f"Processed {len(all_results)} email(s) at {time.strftime('%I:%M:%S %p')}")
-        else:
-            st.info("No new emails found in this batch.")
-
-      
-        st.progress(100, text="Waiting 3 minutes before next run...")
-        time.sleep(180)
-        st.rerun()
-
-
-elif st.session_state.last_results:
-    st.subheader("Last Batch Results")
-    df = pd.DataFrame(st.session_state.last_results)
-    st.dataframe(df, width="stretch")
-    st.caption(f"Last updated at {time.strftime('%I:%M:%S %p')}")
-
-    if st.session_state.logs:
-        st.subheader("Last Batch Logs")
-        for log in st.session_state.logs:
-            st.write(f"- {log}")
-
-else:
-    st.info("No batch has been run yet. Click Start Batch Job to begin processing.")
+from datetime import datetime, timedelta
+
+import streamlit as st
+import pandas as pd
+from config import BATCH_INTERVAL_SECONDS, DASHBOARD_REFRESH_SECONDS, DASHBOARD_RUN_HISTORY, WORKER_LOCK_ID
+from db import connection
+from job_queue import queue_stats
+
+st.set_page_config(
+    page_title="Insurance Claim Engine",
+    layout="wide"
+)
+
+
+st.markdown("""
+<h1 style='text-align:center; color:#2E86C1;'>Insurance Claim Processing Engine</h1>
+<p style='text-align:center; color:gray;'>
+Email-based insurance claims and Jira updates are processed by the background worker (<code>python worker.py</code>).
+</p>
+""", unsafe_allow_html=True)
+
+st.divider()
+
+
+def worker_running(cursor):
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND objid = %s AND objsubid = 1 AND granted)",
+        (WORKER_LOCK_ID,)
+    )
+    return cursor.fetchone()[0]
+
+
+def run_status(run, running, now):
+    """A run left unfinished by a worker that is gone shows as aborted rather than running forever."""
+    if run["status"] != "running":
+        return run["status"]
+    if running or now - run["started_at"] < timedelta(seconds=2 * BATCH_INTERVAL_SECONDS):
+        return "running"
+    return "aborted"
+
+
+def load_runs(cursor):
+    cursor.execute(
+        """
+        SELECT id, started_at, finished_at, status, results, logs, stats, error
+        FROM batch_runs
+        ORDER BY id DESC
+        LIMIT %s
+        """,
+        (DASHBOARD_RUN_HISTORY,)
+    )
+    columns = [column.name for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+@st.fragment(run_every=DASHBOARD_REFRESH_SECONDS)
+def dashboard():
+    try:
+        with connection() as conn, conn.cursor() as cursor:
+            running = worker_running(cursor)
+            runs = load_runs(cursor)
+            jobs = queue_stats(cursor)
+            conn.rollback()
+    except Exception as e:
+        st.error(f"Could not read batch runs: {e}")
+        return
+
+    st.markdown(
+        f"""
+        <div style="background-color:#F4F6F6; border-radius:10px; padding:10px; text-align:center;">
+        <b>Worker:</b> {"<span style='color:green;'>Running</span>" if running else "<span style='color:red;'>Stopped</span>"}
+        &nbsp;|&nbsp; <b>Claim jobs:</b> {" · ".join(f"{count} {status}" for status, count in jobs.items())}
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+    st.divider()
+
+    if not runs:
+        st.info("No batch has been run yet. Start the worker with python worker.py to begin processing.")
+        return
+
+    now = datetime.now().astimezone()
+    latest = runs[0]
+    finished = next((run for run in runs if run["finished_at"]), None)
+    latest_status = run_status(latest, running, now)
+    if latest_status == "running":
+        st.info(f"Batch {latest['id']} running since {latest['started_at']:%I:%M:%S %p}.")
+    elif latest_status == "aborted":
+        st.warning(
+            f"Batch {latest['id']} started at {latest['started_at']:%I:%M:%S %p} and never finished; "
+            "its worker appears to have stopped."
+        )
+
+    if finished:
+        stats = finished["stats"] or {}
+        if finished["status"] == "succeeded":
+            st.success(f"Batch {finished['id']} completed in {stats.get('seconds', 0):.2f} seconds.")
+        else:
+            st.error(f"Batch {finished['id']} failed: {finished['error']}")
+
+        st.subheader("Batch Logs")
+        for log in finished["logs"]:
+            st.write(f"- {log}")
+
+        if finished["results"]:
+            st.subheader("Processed Emails and Status")
+            st.dataframe(pd.DataFrame(finished["results"]), width="stretch")
+            st.caption(f"Processed {len(finished['results'])} email(s) at {finished['finished_at']:%I:%M:%S %p}")
+        else:
+            st.info("No new emails found in this batch.")
+
+        cache_stats = stats.get("llm_cache")
+        if cache_stats:
+            st.caption(
+                f"LLM cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, "
+                f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)"
+            )
+        answer_stats = stats.get("answer_cache")
+        if answer_stats:
+            st.caption(
+                f"Query answer cache: {answer_stats['hits']} hits, "
+                f"{answer_stats['misses']} misses ({answer_stats['hit_rate']:.0%} hit rate)"
+            )
+
+        if stats.get("stages"):
+            st.subheader("Stage Latency (seconds)")
+            st.dataframe(pd.DataFrame(stats["stages"]).set_index("stage"), width="stretch")
+        if stats.get("counters"):
+            st.caption(" | ".join(f"{name}: {value:g}" for name, value in stats["counters"].items()))
+
+        init_times = stats.get("service_init_seconds")
+        if init_times:
+            with st.expander("Service initialization times"):
+                st.dataframe(
+                    pd.DataFrame([{"service": name, "seconds": seconds} for name, seconds in init_times.items()]),
+                    width="stretch"
+                )
+
+    with st.expander("Recent batch runs"):
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "batch": run["id"],
+                    "started": run["started_at"],
+                    "finished": run["finished_at"],
+                    "status": run_status(run, running, now),
+                    "results": len(run["results"]),
+                    "seconds": (run["stats"] or {}).get("seconds"),
+                    "llm_calls_saved": (run["stats"] or {}).get("llm_calls_saved"),
+                }
+                for run in runs
+            ]),
+            width="stretch"
+        )
+
+
+dashboard()
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import tempfile
+
+from psycopg2.extras import execute_values
+
+from config import ATTACHMENT_DIR
+
+UNRECOGNIZED_DOCUMENT = "other"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def attachment_path(sha256: str, ext: str = ".pdf") -> str:
+    return os.path.join(ATTACHMENT_DIR, sha256[:2], f"{sha256}{ext}")
+
+
+def store_attachment(data: bytes, ext: str = ".pdf"):
+    """Store an attachment under its SHA-256; identical files are kept once."""
+    sha256 = content_hash(data)
+    path = attachment_path(sha256, ext)
+    if os.path.exists(path):
+        return sha256, path, False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return sha256, path, True
+
+
+def lookup_cached(cursor, hashes):
+    if not hashes:
+        return {}
+    cursor.execute(
+        """
+        SELECT sha256, text, document_type, classification_confidence
+        FROM attachment_cache WHERE sha256 = ANY(%s)
+        """,
+        (list(hashes),)
+    )
+    return {sha256: (text, document_type, confidence) for sha256, text, document_type, confidence in cursor.fetchall()}
+
+
+def save_texts(cursor, texts):
+    if not texts:
+        return
+    execute_values(
+        cursor,
+        """
+        INSERT INTO attachment_cache (sha256, text) VALUES %s
+        ON CONFLICT (sha256) DO NOTHING
+        """,
+        list(texts.items())
+    )
+
+
+def save_document_types(cursor, document_types):
+    """Store {sha256: (document_type, classified_by, confidence)} classifications."""
+    if not document_types:
+        return
+    execute_values(
+        cursor,
+        """
+        UPDATE attachment_cache SET
+            document_type = v.document_type,
+            classified_by = v.classified_by,
+            classification_confidence = v.confidence,
+            classified_at = now()
+        FROM (VALUES %s) AS v(sha256, document_type, classified_by, confidence)
+        WHERE attachment_cache.sha256 = v.sha256
+        """,
+        [(sha256, *classification) for sha256, classification in document_types.items()],
+        template="(%s, %s, %s, %s::real)"
+    )
@@ -0,0 +1,206 @@
+"""Synthetic claim mail for benchmarks: realistic bodies, PDF attachments and senders."""
+import functools
+import random
+from datetime import datetime, timedelta
+
+import fitz
+
+from benchmarks.fakes import FakeAttachment, FakeMessage
+from policies import POLICY_REQUIREMENTS
+
+FIRST_NAMES = ("Asha", "Rahul", "Maria", "John", "Priya", "David", "Meera", "Carlos", "Nina", "Omar")
+LAST_NAMES = ("Sharma", "Verma", "Garcia", "Smith", "Iyer", "Brown", "Nair", "Lopez", "Khan", "Chen")
+
+DOCUMENTS = {
+    "ssn_card": """SOCIAL SECURITY
+This number has been established for
+{name}
+{ssn}
+""",
+    "doctor_bill": """City Care Hospital - Hospital Bill
+Bill No: HB-{number}
+Patient Name: {name}
+Date of Admission: {event_date}
+Consultation fee 1,200.00
+Room charges 8,400.00
+Total payable: {amount}
+Amount due on discharge.
+""",
+    "doctor_receipt": """City Care Hospital - Receipt
+Receipt No: R-{number}
+Received with thanks from {name}
+Amount paid: {amount}
+Mode of payment: Card
+Transaction ID: TX{number}
+""",
+    "driver_license": """STATE DEPARTMENT OF MOTOR VEHICLES
+DRIVER LICENSE
+License No: DL{number}
+Name: {name}
+Date of Birth: {birth_date}
+Expires: 2031-01-01
+""",
+    "vehicle_registration": """Vehicle Registration Certificate
+Registration No: {plate}
+Registered Owner: {name}
+VIN: 1HGCM82633A{number}
+Engine No: EN{number}
+""",
+    "accident_report": """POLICE REPORT - Accident Report
+Case No: {number}
+Date of Accident: {event_date}
+Place of Accident: Ring Road junction
+Investigating Officer: Insp. R. Mehta
+Witness statements attached.
+""",
+    "death_certificate": """Certificate of Death
+Name of deceased: {insured}
+Date of Death: {event_date}
+Place of Death: General Hospital
+Cause of Death: Cardiac arrest
+Registrar of Births and Deaths
+""",
+    "medical_records": """Discharge Summary
+Patient: {insured}
+Admission Date: {event_date}
+Diagnosis: Acute myocardial infarction
+Chief complaint: chest pain. Attending Physician: Dr. K. Rao
+""",
+}
+
+BODIES = {
+    "health": """Hello,
+I would like to submit a health insurance claim for my hospital treatment.
+Patient Name: {name}
+Policy Number: HLT{policy}
+Date of Birth: {birth_date}
+Date of Treatment: {event_date}
+The bill, receipt and my SSN card are attached.
+Regards,
+{name}""",
+    "vehicle": """Hi team,
+Please process my vehicle insurance claim for the car accident last week.
+Owner Name: {name}
+Policy No: VEH{policy}
+Vehicle Number: {plate}
+Accident Date: {event_date}
+Documents are attached.
+Thanks,
+{name}""",
+    "life": """Dear Sir/Madam,
+I am writing to claim the life insurance of my father, who passed away.
+Beneficiary Name: {name}
+Policy Number: LIF{policy}
+Date of Birth: {birth_date}
+Date of Death: {event_date}
+Please find the documents enclosed.
+{name}""",
+}
+
+QUERY_BODIES = (
+    "Hello, what does your health policy cover for hospital stays and how do I renew it?",
+    "Hi, could you tell me which vehicle plans include roadside assistance?",
+    "Good morning. What is the waiting period on your life cover plans?",
+)
+
+# Scenario mix: (scenario, weight).
+SCENARIOS = (
+    ("complete_claim", 0.45),
+    ("missing_documents", 0.2),
+    ("unclassified_attachment", 0.1),
+    ("query", 0.1),
+    ("non_pdf", 0.05),
+    ("unregistered", 0.1),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def make_pdf(text):
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_text((72, 72), text, fontsize=10)
+        return doc.tobytes()
+
+
+def _person(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _claim_values(rng):
+    name = _person(rng)
+    return {
+        "name": name,
+        "insured": _person(rng),
+        "policy": rng.randint(100000, 999999),
+        "number": rng.randint(10000, 99999),
+        "ssn": f"{rng.randint(100, 899)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+        "plate": f"MH{rng.randint(10, 49)}AB{rng.randint(1000, 9999)}",
+        "amount": f"{rng.randint(5, 90) * 1000:,}.00",
+        "birth_date": f"{rng.randint(1950, 2000)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "event_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    }
+
+
+def _documents(document_types, values):
+    return [
+        FakeAttachment(f"{document_type}.pdf", make_pdf(DOCUMENTS[document_type].format(**values)))
+        for document_type in document_types
+    ]
+
+
+def build_message(rng, index, sender, scenario, received):
+    policy_type = rng.choice(sorted(POLICY_REQUIREMENTS))
+    values = _claim_values(rng)
+    required = POLICY_REQUIREMENTS[policy_type]["documents"]
+    body = BODIES[policy_type].format(**values)
+    attachments = []
+
+    if scenario in ("complete_claim", "unregistered"):
+        attachments = _documents(required, values)
+    elif scenario == "missing_documents":
+        attachments = _documents(required[:1], values)
+    elif scenario == "unclassified_attachment":
+        attachments = _documents(required[:-1], values)
+        attachments.append(FakeAttachment("scan_0001.pdf", make_pdf(f"Scanned page {values['number']}\n{values['name']}")))
+    elif scenario == "query":
+        body = rng.choice(QUERY_BODIES)
+    elif scenario == "non_pdf":
+        attachments = [FakeAttachment("bill_photo.jpg", b"\xff\xd8\xff\xe0 not really a jpeg")]
+
+    return FakeMessage(f"bench-{index:06d}", sender, received, body, attachments)
+
+
+def build_corpus(size, senders=None, seed=7, now=None):
+    """Return (messages, registered_emails) for a batch of size messages.
+
+    Senders repeat, so per-sender ordering and claim merging are exercised;
+    received times fall inside the mailbox's initial lookback window.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now().astimezone()
+    senders = senders or max(1, size // 3)
+    registered = [f"member{number:05d}@example.com" for number in range(senders)]
+    scenarios, weights = zip(*SCENARIOS)
+
+    messages = []
+    for index in range(size):
+        scenario = rng.choices(scenarios, weights)[0]
+        if scenario == "unregistered":
+            sender = f"stranger{index:05d}@example.org"
+        else:
+            sender = rng.choice(registered)
+        received = now - timedelta(seconds=rng.randint(0, 600))
+        messages.append(build_message(rng, index, sender, scenario, received))
+    messages.sort(key=lambda msg: msg.received)
+    return messages, registered
+
+
+def seed_submitted_claims(db, count, project_key="CLM"):
+    """Add count submitted claims with Jira tickets for the Jira polling benchmark."""
+    for number in range(1, count + 1):
+        db.add_claim(
+            f"submitted{number:05d}@example.com",
+            claim_data={"policy_number": f"HLT{number:06d}"},
+            jira_ticket=f"{project_key}-{number}",
+            status="submitted",
+        )
@@ -0,0 +1,114 @@
+"""Check the quantized embedding backend against the full-precision model.
+
+Embeds the policy chunks from the FAISS index (POLICY_INDEX_DIR) and a fixed
+query set with both models, then reports query vector agreement, top-k
+retrieval overlap, load time, throughput and serialized model size. Exits
+non-zero when the overlap is below --min-overlap.
+
+    python -m benchmarks.embedding_quality --k 3 --min-overlap 0.9
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.vector_backends import QUERIES
+from config import EMBEDDING_MODEL, POLICY_INDEX_DIR
+from policy_index import CHUNKS_FILE
+
+
+class _NoCache:
+    def get_many(self, keys):
+        return {}
+
+    def set_many(self, items):
+        pass
+
+
+def load_reference():
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, model_kwargs={"device": "cpu"})
+
+
+def load_quantized():
+    from embeddings import QuantizedEmbeddings
+
+    # The cache would turn the throughput measurement into a lookup benchmark.
+    return QuantizedEmbeddings(cache=_NoCache())
+
+
+def model_size_mb(embeddings):
+    import torch
+
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "client", None)
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 2 ** 20
+
+
+def timed_embed(embeddings, texts):
+    started = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - started
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors, elapsed
+
+
+def top_k(queries, corpus, k):
+    return [set(row) for row in np.argsort(-(queries @ corpus.T), axis=1)[:, :k]]
+
+
+def load_chunks(index_dir):
+    with open(os.path.join(index_dir, CHUNKS_FILE), encoding="utf-8") as f:
+        return [chunk["text"] for chunk in json.load(f)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--index", default=POLICY_INDEX_DIR, help="policy index whose chunks form the corpus")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--min-overlap", type=float, default=0.9)
+    args = parser.parse_args(argv)
+
+    chunks = load_chunks(args.index)
+    if not chunks:
+        print(f"No policy chunks in {args.index}; run `python policy_index.py ingest` first.")
+        return 1
+    queries = list(QUERIES)
+
+    report = {}
+    for name, loader in (("fp32", load_reference), ("int8", load_quantized)):
+        started = time.perf_counter()
+        embeddings = loader()
+        load_seconds = time.perf_counter() - started
+        corpus, corpus_seconds = timed_embed(embeddings, chunks)
+        query_vectors, _ = timed_embed(embeddings, queries)
+        report[name] = {
+            "load_seconds": load_seconds,
+            "texts_per_second": len(chunks) / corpus_seconds if corpus_seconds else 0.0,
+            "size_mb": model_size_mb(embeddings),
+            "corpus": corpus,
+            "queries": query_vectors,
+        }
+
+    print(f"{'model':>6} {'load s':>7} {'texts/s':>9} {'size MB':>8}")
+    for name, row in report.items():
+        print(f"{name:>6} {row['load_seconds']:>7.2f} {row['texts_per_second']:>9.1f} {row['size_mb']:>8.1f}")
+
+    agreement = np.sum(report["fp32"]["queries"] * report["int8"]["queries"], axis=1)
+    expected = top_k(report["fp32"]["queries"], report["fp32"]["corpus"], args.k)
+    actual = top_k(report["int8"]["queries"], report["int8"]["corpus"], args.k)
+    overlap = sum(len(want & got) for want, got in zip(expected, actual)) / sum(len(want) for want in expected)
+
+    print(f"\nQuery cosine fp32 vs int8: mean {agreement.mean():.4f}, min {agreement.min():.4f}")
+    print(f"Top-{args.k} retrieval overlap over {len(chunks)} chunk(s): {overlap:.0%}")
+    return 0 if overlap >= args.min_overlap else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,530 @@
+"""In-process stand-ins for O365, Jira, the LLM, RAG and Postgres.
+
+Each fake sleeps for a configurable latency. Jira issue creation and mail
+sends can also fail at a configurable rate, and the chat model can return
+broken JSON, so benchmarks exercise the same retry paths as production
+without any network access.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from requests.exceptions import ReadTimeout
+
+from db import MIGRATIONS
+from doc_classifier import classify_document
+from field_extractor import extract_fields
+
+
+class Latency:
+    """Sleep for a jittered delay and fail with probability failure_rate."""
+
+    def __init__(self, seconds=0.0, jitter=0.25, failure_rate=0.0, seed=None):
+        self.seconds = seconds
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            return self.seconds * (1 + self._random.uniform(-self.jitter, self.jitter))
+
+    def wait(self, error=None, what="fake backend"):
+        """Sleep; if error is given, raise it at the configured failure rate."""
+        delay = self.delay()
+        with self._lock:
+            fail = self._random.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail and error is not None:
+            raise error(f"Injected {what} failure")
+
+
+# O365
+
+class FakeAttachment:
+    def __init__(self, name, content):
+        self.name = name
+        self.content = content
+
+
+class FakeAttachments(list):
+    """Attachment list; the fake corpus is already in memory, so downloading is a no-op."""
+
+    def __init__(self, attachments=()):
+        super().__init__(attachments)
+        self.downloads = 0
+
+    def download_attachments(self):
+        self.downloads += 1
+        return True
+
+
+class FakeMessage:
+    def __init__(self, object_id, sender, received, body, attachments=()):
+        self.object_id = object_id
+        self.sender = SimpleNamespace(address=sender) if sender else None
+        self.received = received
+        self.body = body
+        self.attachments = FakeAttachments(attachments)
+        self.has_attachments = bool(self.attachments)
+        self.latency = None
+
+    def reply(self):
+        return FakeOutgoingMessage(self.latency or Latency())
+
+
+class FakeQuery:
+    def __init__(self):
+        self.since = None
+
+    def greater_equal(self, field, value):
+        self.since = value
+        return self
+
+
+class FakeFolder:
+    def __init__(self, messages, latency):
+        self.messages = messages
+        self.latency = latency
+
+    def new_query(self):
+        return FakeQuery()
+
+    def get_messages(self, limit=None, batch=None, query=None, download_attachments=False):
+        matching = [msg for msg in self.messages if not query or not query.since or msg.received >= query.since]
+        page_size = batch or len(matching) or 1
+        for start in range(0, len(matching), page_size):
+            self.latency.wait()
+            yield from matching[start:start + page_size]
+
+
+class FakeOutgoingMessage:
+    def __init__(self, latency):
+        self.latency = latency
+        self.to = set()
+        self.subject = None
+        self.body = None
+        self.body_type = None
+
+    def reply(self):
+        return FakeOutgoingMessage(self.latency)
+
+    def send(self):
+        self.latency.wait(ReadTimeout, "Graph send")
+        return True
+
+
+class FakeMailbox:
+    def __init__(self, messages, latency):
+        self.messages = {msg.object_id: msg for msg in messages}
+        self.folder = FakeFolder(messages, latency)
+        self.latency = latency
+
+    def inbox_folder(self):
+        return self.folder
+
+    def new_message(self):
+        return FakeOutgoingMessage(self.latency)
+
+    def get_message(self, object_id=None, download_attachments=False):
+        self.latency.wait()
+        return self.messages.get(object_id)
+
+
+class FakeAccount:
+    def __init__(self, messages, latency=None):
+        self._mailbox = FakeMailbox(messages, latency or Latency())
+
+    def mailbox(self):
+        return self._mailbox
+
+
+# Jira
+
+class FakeResultList(list):
+    def __init__(self, items, total):
+        super().__init__(items)
+        self.total = total
+
+
+class FakeJira:
+    STATUSES = ("approved", "declined", "in progress", "done")
+
+    def __init__(self, latency=None, project_key="CLM"):
+        self.latency = latency or Latency()
+        self.project_key = project_key
+        self._counter = itertools.count(1)
+        self.created = []
+
+    def create_issue(self, fields):
+        self.latency.wait(ReadTimeout, "Jira create_issue")
+        issue = SimpleNamespace(key=f"{self.project_key}-{next(self._counter)}", fields=fields)
+        self.created.append(issue)
+        return issue
+
+    def status_of(self, key):
+        return self.STATUSES[sum(map(ord, key)) % len(self.STATUSES)]
+
+    def search_issues(self, jql, startAt=0, maxResults=50, fields=None, validate_query=True):
+        self.latency.wait()
+        keys = re.findall(r'"([A-Z][A-Z0-9]*-\d+)"', jql)
+        page = keys[startAt:startAt + maxResults]
+        issues = [
+            SimpleNamespace(key=key, fields=SimpleNamespace(status=SimpleNamespace(name=self.status_of(key).title())))
+            for key in page
+        ]
+        return FakeResultList(issues, len(keys))
+
+
+# LLM and RAG
+
+def _between(text, start, end):
+    begin = text.find(start)
+    if begin < 0:
+        return ""
+    begin += len(start)
+    finish = text.find(end, begin)
+    return text[begin:finish if finish >= 0 else None]
+
+
+def fake_extraction(prompt):
+    body = _between(prompt, "Email body:", "Text extracted from the PDF attachments:").strip()
+    attachments = _between(prompt, "Text extracted from the PDF attachments:", "1. Detect policy type:")
+    sections = re.split(r"\n\s*Attachment (\d+) \(([^)]*)\):\n", attachments)
+    documents = []
+    texts = []
+    for number, label, text in zip(sections[1::3], sections[2::3], sections[3::3]):
+        texts.append(text)
+        if "already identified" in label:
+            continue
+        classification = classify_document(text, threshold=0.0)
+        if classification.document_type:
+            documents.append({"attachment": int(number), "document_type": classification.document_type})
+
+    prefilled = extract_fields(body, texts)
+    intent = prefilled.intent or ("query" if "?" in body else "claim")
+    return json.dumps({
+        "policy_type": prefilled.policy_type,
+        "intent": intent,
+        "fields": prefilled.fields,
+        "patient_summary": body[:200],
+        "documents": documents,
+    })
+
+
+def fake_completion(prompt):
+    if "Return JSON ONLY" in prompt:
+        return fake_extraction(prompt)
+    if "Summarize the following excerpt" in prompt:
+        return _between(prompt, "Excerpt:", "\x00").strip()[:400]
+    placeholders = " ".join(sorted(set(re.findall(r"\{\{\w+\}\}", prompt))))
+    return f"Dear member,\nThank you for contacting us. {placeholders}\nKind regards,\nAIG team"
+
+
+class FakeChatModel:
+    """Chat model returning plausible, deterministic answers for the pipeline's prompts.
+
+    invalid_json_rate makes extraction replies unparsable so the repair loop runs.
+    """
+
+    def __init__(self, latency=None, invalid_json_rate=0.0, seed=None):
+        self.latency = latency or Latency()
+        self.invalid_json_rate = invalid_json_rate
+        self.model = "fake-chat"
+        self.temperature = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        self.latency.wait()
+        return self._respond(prompt)
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.latency.delay())
+        return self._respond(prompt)
+
+    def _respond(self, prompt):
+        content = fake_completion(prompt)
+        if "Return JSON ONLY" in prompt:
+            with self._lock:
+                broken = self._random.random() < self.invalid_json_rate
+            if broken:
+                content = content[: len(content) // 2]
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(content) // 4}
+        return SimpleNamespace(content=content, usage_metadata=usage)
+
+
+class FakePolicyContext:
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+
+    def prepare(self, texts):
+        list(texts)
+        self.latency.wait()
+
+    def context_for(self, text):
+        self.latency.wait()
+        return "Health, vehicle and life policies cover documented claims up to the insured amount.", []
+
+    def embed(self, text):
+        """Hashed bag of words, so reworded questions with the same terms land close together."""
+        vector = np.zeros(64, dtype=np.float32)
+        for word in re.findall(r"[a-z]+", text.lower()):
+            vector[zlib.crc32(word.encode()) % len(vector)] += 1
+        return vector
+
+    def store_version(self):
+        return "fake"
+
+
+class FakeMailDispatcher:
+    def wake(self):
+        pass
+
+
+# Postgres
+
+class FakeDatabase:
+    """In-memory tables answering exactly the SQL statements the pipeline issues.
+
+    Statements are matched on their leading text; anything unknown raises so
+    the fake fails loudly when the pipeline's SQL changes.
+    """
+
+    def __init__(self, registered_emails=(), latency=None):
+        self.latency = latency or Latency()
+        self.lock = threading.Lock()
+        self.claims = {}
+        self.sync_state = {}
+        self.processed = {}
+        self.attachment_cache = {}
+        self.outbox = []
+        self.batch_runs = []
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        for email in registered_emails:
+            self.add_claim(email)
+
+    def add_claim(self, email, **columns):
+        row = {
+            "id": next(self._ids), "claim_data": {}, "document_data": {}, "jira_ticket": None,
+            "jira_message_id": None, "status": None,
+        }
+        row.update(columns)
+        self.claims[email] = row
+        return row
+
+    def pool(self):
+        return FakePool(self)
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self._pending_values = []
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def mogrify(self, template, args):
+        # execute_values builds one VALUES row per mogrify call; keep the
+        # arguments and let execute() pick them up.
+        self._pending_values.append(tuple(args))
+        return b"(?)"
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def execute(self, sql, args=None):
+        self.db.latency.wait()
+        if isinstance(sql, bytes):
+            sql = sql.decode()
+        statement = " ".join(sql.split())
+        values, self._pending_values = self._pending_values, []
+        with self.db.lock:
+            self.rows = self._dispatch(statement, args or (), values)
+
+    def _dispatch(self, statement, args, values):
+        db = self.db
+        if statement == "SELECT 1":
+            return [(1,)]
+        if "pg_advisory" in statement or "pg_try_advisory" in statement:
+            return [(True,)]
+        if statement.startswith(("CREATE TABLE IF NOT EXISTS schema_migrations", "INSERT INTO schema_migrations")):
+            return []
+        if statement.startswith("SELECT version FROM schema_migrations"):
+            return [(version,) for version, _, _ in MIGRATIONS]
+
+        if statement.startswith("SELECT value FROM sync_state"):
+            return [(db.sync_state[args[0]],)] if args[0] in db.sync_state else []
+        if statement.startswith("INSERT INTO sync_state"):
+            db.sync_state[args[0]] = args[1]
+            return []
+
+        if statement.startswith("SELECT message_id FROM claim_jobs WHERE message_id = ANY(%s) UNION"):
+            return [
+                (message_id,) for message_id in set(args[0]) if message_id in db.jobs or message_id in db.processed
+            ]
+        if statement.startswith("SELECT message_id FROM processed_messages"):
+            return [(message_id,) for message_id in args[0] if message_id in db.processed]
+        if statement.startswith("INSERT INTO processed_messages"):
+            for message_id, email, received, status in values:
+                db.processed.setdefault(message_id, (email, received, status))
+            return []
+
+        if statement.startswith("SELECT DISTINCT email FROM claims"):
+            return [(email,) for email in set(args[0]) if email in db.claims]
+        if statement.startswith("SELECT id FROM claims WHERE email"):
+            return [(db.claims[args[0]]["id"],)] if args[0] in db.claims else []
+        if statement.startswith("SELECT id, email, jira_ticket, status, claim_data FROM claims"):
+            return [
+                (row["id"], email, row["jira_ticket"], row["status"], row["claim_data"])
+                for email, row in db.claims.items()
+                if row["status"] == "submitted" and row["jira_ticket"]
+            ]
+        if statement.startswith("UPDATE claims SET claim_data = COALESCE(claim_data"):
+            fields, documents, email = args
+            row = db.claims.get(email)
+            if not row:
+                return []
+            row["claim_data"] = {**(row["claim_data"] or {}), **json.loads(fields)}
+            provided = set((row["document_data"] or {}).get("provided_documents", [])) | set(json.loads(documents))
+            row["document_data"] = {**(row["document_data"] or {}), "provided_documents": sorted(provided)}
+            return [(dict(row["claim_data"]), dict(row["document_data"]))]
+        if statement.startswith("SELECT jira_ticket FROM claims WHERE email"):
+            row = db.claims.get(args[0])
+            return [(row["jira_ticket"],)] if row and row["jira_ticket"] and row["jira_message_id"] == args[1] else []
+        if statement.startswith("UPDATE claims SET jira_ticket = %s"):
+            jira_ticket, message_id, email = args
+            row = db.claims.get(email)
+            if row:
+                row.update(jira_ticket=jira_ticket, jira_message_id=message_id, status="submitted")
+            return []
+        if statement.startswith("UPDATE claims SET status = v.status"):
+            by_id = {row["id"]: row for row in db.claims.values()}
+            updated = []
+            for claim_id, jira_ticket, status in values:
+                row = by_id.get(claim_id)
+                if row and row["jira_ticket"] == jira_ticket and row["status"] == "submitted":
+                    row["status"] = status
+                    updated.append((claim_id,))
+            return updated
+
+        if statement.startswith("SELECT sha256, text, document_type"):
+            return [
+                (sha256, *db.attachment_cache[sha256]) for sha256 in args[0] if sha256 in db.attachment_cache
+            ]
+        if statement.startswith("INSERT INTO attachment_cache"):
+            for sha256, text in values:
+                db.attachment_cache.setdefault(sha256, (text, None, None))
+            return []
+        if statement.startswith("UPDATE attachment_cache SET"):
+            for sha256, document_type, _, confidence in values:
+                if sha256 in db.attachment_cache:
+                    db.attachment_cache[sha256] = (db.attachment_cache[sha256][0], document_type, confidence)
+            return []
+
+        if statement.startswith("INSERT INTO claim_jobs"):
+            inserted = []
+            for message_id, sender, received_at in values:
+                if message_id not in db.jobs:
+                    job_id = len(db.jobs) + 1
+                    db.jobs[message_id] = {
+                        "id": job_id, "message_id": message_id, "sender": sender, "received_at": received_at,
+                        "status": "pending", "attempts": 0, "locked_by": None, "next_attempt_at": None,
+                    }
+                    inserted.append((job_id,))
+            return inserted
+        if statement.startswith("UPDATE claim_jobs SET status = 'running'"):
+            owner, _, limit = args
+            now = datetime.now().astimezone()
+            unfinished = [job for job in db.jobs.values() if job["status"] in ("pending", "running")]
+            earliest = {}
+            for job in sorted(unfinished, key=lambda job: (job["received_at"], job["id"])):
+                earliest.setdefault(job["sender"], job)
+            leased = [
+                job for job in earliest.values()
+                if job["status"] == "pending" and (job["next_attempt_at"] is None or job["next_attempt_at"] <= now)
+            ]
+            leased = sorted(leased, key=lambda job: (job["received_at"], job["id"]))[:limit]
+            for job in leased:
+                job.update(status="running", attempts=job["attempts"] + 1, locked_by=owner)
+            return [(job["id"], job["message_id"], job["sender"], job["received_at"], job["attempts"]) for job in leased]
+        if statement.startswith("UPDATE claim_jobs SET locked_until"):
+            return []
+        if statement.startswith(("UPDATE claim_jobs SET status = 'done'", "UPDATE claim_jobs SET status = v.status")):
+            by_id = {job["id"]: job for job in db.jobs.values()}
+            done = statement.startswith("UPDATE claim_jobs SET status = 'done'")
+            for job_id, owner, *rest in values:
+                job = by_id.get(job_id)
+                if not job or job["locked_by"] != owner or job["status"] != "running":
+                    continue
+                job["locked_by"] = None
+                if done:
+                    job["status"] = "done"
+                else:
+                    error, status, delay = rest
+                    job["status"] = status
+                    job["next_attempt_at"] = datetime.now().astimezone() + timedelta(seconds=delay)
+            return []
+        if statement.startswith("INSERT INTO outbox"):
+            db.outbox.extend(values)
+            return []
+        if statement.startswith("INSERT INTO batch_runs"):
+            db.batch_runs.append({"started_at": datetime.now().astimezone()})
+            return [(len(db.batch_runs),)]
+        if statement.startswith("UPDATE batch_runs"):
+            return []
+
+        raise NotImplementedError(f"FakeDatabase does not understand: {statement[:120]}")
+
+
+class FakeConnection:
+    encoding = "UTF8"
+    closed = False
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        cursor = FakeCursor(self.db)
+        cursor.connection = self
+        return cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, db):
+        self.db = db
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self.db)
+
+    def close(self):
+        pass
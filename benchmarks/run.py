@@ -0,0 +1,174 @@
+"""Offline throughput benchmark for the claim pipeline.
+
+Runs process_claims and process_jira_updates end to end against the fakes in
+benchmarks/fakes.py, injected through registry.override, and reports
+throughput, per-message latency percentiles and peak memory.
+
+    python -m benchmarks.run --sizes 10 50 200 --llm-latency 0.8
+"""
+import argparse
+import io
+import logging
+import os
+import resource
+import tempfile
+import time
+from contextlib import ExitStack, redirect_stdout
+
+# Attachments and the LLM cache must not touch the real directories; config
+# reads these when the pipeline modules are imported below.
+_WORKDIR = tempfile.mkdtemp(prefix="policyiq-bench-")
+os.environ.setdefault("ATTACHMENT_DIR", os.path.join(_WORKDIR, "attachments"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_WORKDIR, "llm_cache.sqlite3"))
+# The fakes have no quota, so client-side rate limits are off unless set.
+for _name in ("LLM_RATE_PER_SECOND", "JIRA_RATE_PER_SECOND", "GRAPH_RATE_PER_SECOND"):
+    os.environ.setdefault(_name, "0")
+os.environ.setdefault("BACKEND_RETRY_BASE_SECONDS", "0.1")
+
+from answer_cache import AnswerCache  # noqa: E402
+from benchmarks.corpus import build_corpus, seed_submitted_claims  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    FakeAccount,
+    FakeChatModel,
+    FakeDatabase,
+    FakeJira,
+    FakeMailDispatcher,
+    FakePolicyContext,
+    Latency,
+)
+from insurance_test import process_claims, process_jira_updates  # noqa: E402
+from llm_cache import CachedLLM, LLMCache  # noqa: E402
+from metrics import metrics, percentile  # noqa: E402
+from services import registry  # noqa: E402
+
+
+def fake_services(args, db, messages=(), run_name="run"):
+    cache_path = os.path.join(_WORKDIR, f"llm_cache_{run_name}.sqlite3")
+    chat = FakeChatModel(Latency(args.llm_latency, seed=args.seed), args.invalid_json_rate, seed=args.seed)
+    return {
+        "db_pool": db.pool(),
+        "account": FakeAccount(messages, Latency(args.graph_latency, failure_rate=args.mail_failure_rate, seed=args.seed)),
+        "jira": FakeJira(Latency(args.jira_latency, failure_rate=args.jira_failure_rate, seed=args.seed)),
+        "chat": CachedLLM(chat, LLMCache(path=cache_path)),
+        "answer_cache": AnswerCache(path=os.path.join(_WORKDIR, f"answer_cache_{run_name}.sqlite3")),
+        "policy_context": FakePolicyContext(Latency(args.rag_latency, seed=args.seed)),
+        "mail_dispatcher": FakeMailDispatcher(),
+    }
+
+
+def run_with_fakes(services, fn, verbose=False):
+    with ExitStack() as stack:
+        for name, instance in services.items():
+            stack.enter_context(registry.override(name, instance))
+        if not verbose:
+            stack.enter_context(redirect_stdout(io.StringIO()))
+        metrics.start_batch()
+        started = time.perf_counter()
+        output = fn()
+        return output, time.perf_counter() - started
+
+
+def stage_summary(stage):
+    return next((entry for entry in metrics.batch_snapshot()["stages"] if entry["stage"] == stage), None)
+
+
+def bench_claims(args, size):
+    messages, registered = build_corpus(size, seed=args.seed)
+    db = FakeDatabase(registered, Latency(args.db_latency, seed=args.seed))
+    results, elapsed = run_with_fakes(
+        fake_services(args, db, messages, run_name=f"claims_{size}"),
+        lambda: process_claims(max_workers=args.workers),
+        args.verbose
+    )
+    seconds = [entry["metrics"]["seconds"] for entry in results if "metrics" in entry]
+    statuses = {}
+    for entry in results:
+        statuses[entry["status"]] = statuses.get(entry["status"], 0) + 1
+    counters = metrics.batch_snapshot()["counters"]
+    return {
+        "messages": len(results),
+        "seconds": elapsed,
+        "per_second": len(results) / elapsed if elapsed else 0.0,
+        "p50": percentile(seconds, 0.5),
+        "p95": percentile(seconds, 0.95),
+        "llm_calls": counters.get("llm_calls", 0),
+        "outbox": len(db.outbox),
+        "statuses": statuses,
+    }
+
+
+def bench_jira(args, claims):
+    db = FakeDatabase(latency=Latency(args.db_latency, seed=args.seed))
+    seed_submitted_claims(db, claims)
+    results, elapsed = run_with_fakes(
+        fake_services(args, db, run_name=f"jira_{claims}"), process_jira_updates, args.verbose
+    )
+    search = stage_summary("jira_search") or {}
+    return {
+        "claims": claims,
+        "seconds": elapsed,
+        "per_second": claims / elapsed if elapsed else 0.0,
+        "updated": len(results),
+        "search_p50": search.get("p50", 0.0),
+        "search_p95": search.get("p95", 0.0),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux; children covers the PDF extraction pool.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200], help="messages per claims batch")
+    parser.add_argument("--jira-claims", type=int, nargs="+", default=[100, 1000], help="submitted claims to poll")
+    parser.add_argument("--workers", type=int, default=None, help="claim workers (default CLAIM_WORKERS)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per LLM call")
+    parser.add_argument("--graph-latency", type=float, default=0.1, help="seconds per Graph page or send")
+    parser.add_argument("--jira-latency", type=float, default=0.2, help="seconds per Jira request")
+    parser.add_argument("--rag-latency", type=float, default=0.05, help="seconds per retrieval")
+    parser.add_argument("--db-latency", type=float, default=0.001, help="seconds per SQL statement")
+    parser.add_argument("--jira-failure-rate", type=float, default=0.0, help="share of create_issue calls timing out")
+    parser.add_argument("--mail-failure-rate", type=float, default=0.0, help="share of mail sends failing")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0, help="share of extraction replies with bad JSON")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    print(f"Working directory: {_WORKDIR}")
+
+    print("\nprocess_claims")
+    print(f"{'messages':>9} {'seconds':>8} {'msg/s':>7} {'p50':>7} {'p95':>7} {'llm':>5} {'outbox':>7}  statuses")
+    for size in args.sizes:
+        row = bench_claims(args, size)
+        print(
+            f"{row['messages']:>9} {row['seconds']:>8.2f} {row['per_second']:>7.2f} {row['p50']:>7.3f} "
+            f"{row['p95']:>7.3f} {row['llm_calls']:>5g} {row['outbox']:>7}  {row['statuses']}"
+        )
+
+    print("\nprocess_jira_updates")
+    print(f"{'claims':>9} {'seconds':>8} {'claim/s':>9} {'updated':>8} {'search p50':>11} {'search p95':>11}")
+    for claims in args.jira_claims:
+        row = bench_jira(args, claims)
+        print(
+            f"{row['claims']:>9} {row['seconds']:>8.2f} {row['per_second']:>9.1f} {row['updated']:>8} "
+            f"{row['search_p50']:>11.3f} {row['search_p95']:>11.3f}"
+        )
+
+    if registry.is_initialized("pdf_pool"):
+        registry.get("pdf_pool").shutdown()
+    own, children = peak_rss_mb()
+    print(f"\nPeak RSS: {own:.1f} MiB (process), {children:.1f} MiB (PDF workers)")
+
+
+if __name__ == "__main__":
+    main()
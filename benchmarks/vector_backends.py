@@ -0,0 +1,97 @@
+"""Compare the Chroma and FAISS policy stores on load time and query latency.
+
+Both stores must already exist (POLICY_VECTOR_DB for Chroma, built with
+`python policy_index.py ingest` for FAISS). Query embeddings are computed once
+up front so only the stores themselves are timed.
+
+    python -m benchmarks.vector_backends --repeat 200
+"""
+import argparse
+import time
+
+from config import POLICY_INDEX_DIR, POLICY_VECTOR_DB, RAG_TOP_K
+from metrics import percentile
+from services import registry
+
+QUERIES = (
+    "What does the health policy cover for hospitalization?",
+    "Which documents do I need for a vehicle accident claim?",
+    "How do I claim life insurance after the death of the policy holder?",
+    "Is there a waiting period for pre-existing conditions?",
+    "Does the motor policy cover third party damage?",
+    "How long does claim settlement take?",
+    "What is the maximum sum insured under the family floater plan?",
+    "Are daycare procedures covered without admission?",
+)
+
+
+def load_chroma(embedding_model):
+    from langchain_chroma import Chroma
+
+    return Chroma(persist_directory=POLICY_VECTOR_DB, embedding_function=embedding_model)
+
+
+def load_faiss(embedding_model):
+    from policy_index import FaissPolicyStore
+
+    return FaissPolicyStore.load(POLICY_INDEX_DIR, embedding_function=embedding_model)
+
+
+BACKENDS = {"chroma": load_chroma, "faiss": load_faiss}
+
+
+def bench_backend(name, embedding_model, vectors, k, repeat):
+    started = time.perf_counter()
+    store = BACKENDS[name](embedding_model)
+    store.similarity_search_by_vector(vectors[0], k=k)
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    results = []
+    for number in range(repeat):
+        vector = vectors[number % len(vectors)]
+        started = time.perf_counter()
+        documents = store.similarity_search_by_vector(vector, k=k)
+        latencies.append(time.perf_counter() - started)
+        if number < len(vectors):
+            results.append([doc.page_content for doc in documents])
+    return {
+        "backend": name,
+        "load_ms": load_seconds * 1000,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }, results
+
+
+def overlap(expected, actual):
+    """Share of expected top-k chunks that the other backend also returned."""
+    hits = total = 0
+    for want, got in zip(expected, actual):
+        hits += len(set(want) & set(got))
+        total += len(set(want))
+    return hits / total if total else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=["chroma", "faiss"])
+    parser.add_argument("--k", type=int, default=RAG_TOP_K)
+    parser.add_argument("--repeat", type=int, default=200, help="queries per backend")
+    args = parser.parse_args(argv)
+
+    embedding_model = registry.get("embedding_model")
+    vectors = embedding_model.embed_documents(list(QUERIES))
+
+    print(f"{'backend':>8} {'load ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    top_k = {}
+    for name in args.backends:
+        row, top_k[name] = bench_backend(name, embedding_model, vectors, args.k, args.repeat)
+        print(f"{row['backend']:>8} {row['load_ms']:>9.1f} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+
+    if "chroma" in top_k and "faiss" in top_k:
+        print(f"\nFAISS returned {overlap(top_k['chroma'], top_k['faiss']):.0%} of Chroma's top-{args.k} chunks")
+
+
+if __name__ == "__main__":
+    main()
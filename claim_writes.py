@@ -0,0 +1,124 @@
+import json
+
+from psycopg2.extras import execute_values
+
+from attachment_store import save_document_types
+from outbox import enqueue
+
+def merge_claim(cursor, email, claim_data, provided_documents):
+    """Merge extracted fields and documents into the claim row in one statement.
+
+    Non-empty fields overwrite stored ones (jsonb ||) and provided_documents
+    becomes the sorted union of stored and new documents. The row stays
+    locked until the caller commits, so concurrent workers cannot lose each
+    other's fields; commit right away rather than holding it across slow
+    calls. Returns the merged (claim_data, document_data), or None if the
+    claim row does not exist.
+    """
+    cursor.execute(
+        """
+        UPDATE claims SET
+            claim_data = COALESCE(claim_data, '{}'::jsonb) || %s::jsonb,
+            document_data = jsonb_set(
+                COALESCE(document_data, '{}'::jsonb),
+                '{provided_documents}',
+                (
+                    SELECT COALESCE(jsonb_agg(DISTINCT doc ORDER BY doc), '[]'::jsonb)
+                    FROM jsonb_array_elements_text(
+                        COALESCE(document_data->'provided_documents', '[]'::jsonb) || %s::jsonb
+                    ) AS doc
+                )
+            )
+        WHERE email = %s
+        RETURNING claim_data, document_data
+        """,
+        (
+            json.dumps({key: value for key, value in (claim_data or {}).items() if value}),
+            json.dumps(sorted(set(provided_documents or []))),
+            email,
+        )
+    )
+    return cursor.fetchone()
+
+
+def submitted_ticket(cursor, email, message_id):
+    """Return the Jira ticket an earlier attempt already opened for this message, if any."""
+    cursor.execute(
+        "SELECT jira_ticket FROM claims WHERE email = %s AND jira_message_id = %s AND jira_ticket IS NOT NULL",
+        (email, message_id)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def record_ticket(cursor, email, message_id, jira_ticket):
+    """Mark the claim submitted under jira_ticket.
+
+    The caller commits right after creating the issue, so a retry of the
+    message finds the ticket instead of opening another one.
+    """
+    cursor.execute(
+        "UPDATE claims SET jira_ticket = %s, jira_message_id = %s, status = 'submitted' WHERE email = %s",
+        (jira_ticket, message_id, email)
+    )
+
+
+def record_outcomes(cursor, outcomes):
+    """Add (message_id, email, received_at, status) rows to the processed-message ledger."""
+    if not outcomes:
+        return
+    execute_values(
+        cursor,
+        """
+        INSERT INTO processed_messages (message_id, email, received_at, status)
+        VALUES %s
+        ON CONFLICT (message_id) DO NOTHING
+        """,
+        outcomes
+    )
+
+
+class ClaimWriteBuffer:
+    """Writes produced while processing one message, committed with its outcome.
+
+    Outgoing mail, attachment classifications and the processed-message
+    ledger row are collected while the message is handled and written with
+    execute_values in the message's own transaction by commit(). Mail goes
+    into the outbox table and is sent by the mail dispatcher, so a reply
+    exists exactly when the message is marked processed; a crash before the
+    commit leaves the job to be retried. Writes are not batched across
+    messages, so no second connection is needed while a sender thread holds
+    its own.
+    """
+
+    def __init__(self, msg):
+        self.msg = msg
+        self.committed = False
+        self._document_types = {}
+        self._mails = []
+
+    def record_document_types(self, document_types):
+        self._document_types.update(document_types)
+
+    def enqueue_mail(self, mail):
+        self._mails.append(mail)
+
+    def commit(self, conn, cursor, status):
+        """Write everything with the outcome status and commit; returns the number of mails queued.
+
+        Only the first call writes, so a step that must commit its own state
+        change together with the mail (record_ticket) can call it early.
+        """
+        if self.committed:
+            return len(self._mails)
+        record_outcomes(cursor, [(
+            self.msg.object_id,
+            self.msg.sender.address if self.msg.sender else None,
+            self.msg.received,
+            status
+        )])
+        save_document_types(cursor, self._document_types)
+        enqueue(cursor, self._mails)
+        conn.commit()
+        self.committed = True
+        return len(self._mails)
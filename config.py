@@ -0,0 +1,124 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CLIENT_ID = os.getenv("CLIENT_ID")
+CLIENT_SECRET = os.getenv("CLIENT_SECRET")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+JIRA_SERVER = os.getenv("JIRA_SERVER")
+JIRA_USER = os.getenv("JIRA_USER")
+JIRA_TOKEN = os.getenv("JIRA_TOKEN")
+JIRA_PROJECT_KEY = os.getenv("JIRA_PROJECT_KEY")
+
+PG_HOST = os.getenv("PG_HOST")
+PG_PORT = os.getenv("PG_PORT")
+PG_USER = os.getenv("PG_USER")
+PG_PASSWORD = os.getenv("PG_PASSWORD")
+PG_DB = os.getenv("PG_DB")
+
+REDIRECT_URI = "http://localhost:5300"
+SCOPES = [
+    'https://graph.microsoft.com/Mail.Read',
+    'https://graph.microsoft.com/Mail.ReadWrite',
+    'https://graph.microsoft.com/Mail.Send',
+    'https://graph.microsoft.com/User.Read',
+    'offline_access'
+]
+
+LLM_MODEL = "models/gemini-2.5-flash-lite-preview-06-17"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "2"))
+EMBEDDING_CACHE_ENTRIES = int(os.getenv("EMBEDDING_CACHE_ENTRIES", "4096"))
+POLICY_VECTOR_DB = "policy_vector_db"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+POLICY_INDEX_DIR = os.getenv("POLICY_INDEX_DIR", "policy_index")
+POLICY_DOCS_DIR = os.getenv("POLICY_DOCS_DIR", "policy_docs")
+POLICY_CHUNK_SIZE = int(os.getenv("POLICY_CHUNK_SIZE", "1000"))
+POLICY_CHUNK_OVERLAP = int(os.getenv("POLICY_CHUNK_OVERLAP", "150"))
+
+CLAIM_WORKERS = int(os.getenv("CLAIM_WORKERS", "4"))
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "20000"))
+
+RAG_MODE = os.getenv("RAG_MODE", "summarize")
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "2"))
+RAG_CACHE_THRESHOLD = float(os.getenv("RAG_CACHE_THRESHOLD", "0.95"))
+RAG_CACHE_MAX_ENTRIES = int(os.getenv("RAG_CACHE_MAX_ENTRIES", "256"))
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.sqlite3")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+
+MAIL_PAGE_SIZE = int(os.getenv("MAIL_PAGE_SIZE", "50"))
+MAIL_SYNC_OVERLAP_MINUTES = int(os.getenv("MAIL_SYNC_OVERLAP_MINUTES", "5"))
+MAIL_INITIAL_LOOKBACK_MINUTES = int(os.getenv("MAIL_INITIAL_LOOKBACK_MINUTES", "20"))
+
+JIRA_SEARCH_CHUNK_SIZE = int(os.getenv("JIRA_SEARCH_CHUNK_SIZE", "100"))
+JIRA_POLL_UPDATED_ONLY = os.getenv("JIRA_POLL_UPDATED_ONLY", "false").lower() in ("1", "true", "yes")
+JIRA_POLL_OVERLAP_MINUTES = int(os.getenv("JIRA_POLL_OVERLAP_MINUTES", "5"))
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_HEALTH_CHECK_SECONDS = int(os.getenv("DB_HEALTH_CHECK_SECONDS", "30"))
+
+CLAIM_JOB_BATCH_SIZE = int(os.getenv("CLAIM_JOB_BATCH_SIZE", "20"))
+CLAIM_JOB_LEASE_SECONDS = int(os.getenv("CLAIM_JOB_LEASE_SECONDS", "300"))
+CLAIM_JOB_HEARTBEAT_SECONDS = int(os.getenv("CLAIM_JOB_HEARTBEAT_SECONDS", "60"))
+CLAIM_JOB_MAX_ATTEMPTS = int(os.getenv("CLAIM_JOB_MAX_ATTEMPTS", "5"))
+CLAIM_JOB_RETRY_BASE_SECONDS = int(os.getenv("CLAIM_JOB_RETRY_BASE_SECONDS", "60"))
+CLAIM_JOB_RETRY_MAX_SECONDS = int(os.getenv("CLAIM_JOB_RETRY_MAX_SECONDS", "3600"))
+MAILBOX_FETCH_LOCK_ID = int(os.getenv("MAILBOX_FETCH_LOCK_ID", "7305003"))
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 2)))
+PDF_TIME_BUDGET_SECONDS = float(os.getenv("PDF_TIME_BUDGET_SECONDS", "30"))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR", "Attachments")
+
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+TOKEN_BUDGET_EXTRACTION = int(os.getenv("TOKEN_BUDGET_EXTRACTION", "6000"))
+TOKEN_BUDGET_JIRA = int(os.getenv("TOKEN_BUDGET_JIRA", "12000"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+SUMMARY_MAX_ROUNDS = int(os.getenv("SUMMARY_MAX_ROUNDS", "3"))
+
+DOC_CLASSIFIER_THRESHOLD = float(os.getenv("DOC_CLASSIFIER_THRESHOLD", "0.75"))
+
+MAIL_DISPATCH_IN_PROCESS = os.getenv("MAIL_DISPATCH_IN_PROCESS", "true").lower() in ("1", "true", "yes")
+MAIL_DISPATCH_WORKERS = int(os.getenv("MAIL_DISPATCH_WORKERS", "4"))
+MAIL_DISPATCH_BATCH_SIZE = int(os.getenv("MAIL_DISPATCH_BATCH_SIZE", "50"))
+MAIL_DISPATCH_INTERVAL_SECONDS = int(os.getenv("MAIL_DISPATCH_INTERVAL_SECONDS", "15"))
+MAIL_LEASE_SECONDS = int(os.getenv("MAIL_LEASE_SECONDS", "300"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+MAIL_RETRY_BASE_SECONDS = int(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))
+MAIL_RETRY_MAX_SECONDS = int(os.getenv("MAIL_RETRY_MAX_SECONDS", "3600"))
+
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "2"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "4"))
+JIRA_RATE_PER_SECOND = float(os.getenv("JIRA_RATE_PER_SECOND", "5"))
+JIRA_RATE_BURST = int(os.getenv("JIRA_RATE_BURST", "10"))
+GRAPH_RATE_PER_SECOND = float(os.getenv("GRAPH_RATE_PER_SECOND", "10"))
+GRAPH_RATE_BURST = int(os.getenv("GRAPH_RATE_BURST", "20"))
+BACKEND_RETRY_ATTEMPTS = int(os.getenv("BACKEND_RETRY_ATTEMPTS", "4"))
+BACKEND_RETRY_BASE_SECONDS = float(os.getenv("BACKEND_RETRY_BASE_SECONDS", "1"))
+BACKEND_RETRY_MAX_SECONDS = float(os.getenv("BACKEND_RETRY_MAX_SECONDS", "30"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = int(os.getenv("CIRCUIT_RESET_SECONDS", "60"))
+
+BATCH_INTERVAL_SECONDS = int(os.getenv("BATCH_INTERVAL_SECONDS", "180"))
+WORKER_LOCK_ID = int(os.getenv("WORKER_LOCK_ID", "7305002"))
+DASHBOARD_REFRESH_SECONDS = int(os.getenv("DASHBOARD_REFRESH_SECONDS", "10"))
+DASHBOARD_RUN_HISTORY = int(os.getenv("DASHBOARD_RUN_HISTORY", "20"))
+
+# 0 disables the endpoint; give each worker on a host its own port.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRICS_SAMPLES = int(os.getenv("METRICS_SAMPLES", "2048"))
@@ -0,0 +1,245 @@
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+from config import (
+    DB_HEALTH_CHECK_SECONDS,
+    DB_POOL_MAX,
+    DB_POOL_MIN,
+    PG_DB,
+    PG_HOST,
+    PG_PASSWORD,
+    PG_PORT,
+    PG_USER,
+)
+from services import registry
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_ID = 7305001
+
+MIGRATIONS = [
+    (1, "create claims table", """
+        CREATE TABLE IF NOT EXISTS claims (
+            id SERIAL PRIMARY KEY,
+            email TEXT NOT NULL,
+            claim_data JSONB DEFAULT '{}'::jsonb,
+            jira_ticket TEXT,
+            status TEXT
+        );
+    """),
+    (2, "add claims.document_data", """
+        ALTER TABLE claims
+        ADD COLUMN IF NOT EXISTS document_data JSONB DEFAULT '{}'::jsonb;
+    """),
+    (3, "mailbox sync state and processed message ledger", """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            value TIMESTAMPTZ
+        );
+        CREATE TABLE IF NOT EXISTS processed_messages (
+            message_id TEXT PRIMARY KEY,
+            email TEXT,
+            received_at TIMESTAMPTZ,
+            status TEXT,
+            processed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """),
+    (4, "indexes for claim lookups and Jira polling", """
+        CREATE INDEX IF NOT EXISTS claims_email_idx ON claims (email);
+        CREATE INDEX IF NOT EXISTS claims_submitted_idx ON claims (id) WHERE status = 'submitted';
+    """),
+    (5, "attachment text and document type cache", """
+        CREATE TABLE IF NOT EXISTS attachment_cache (
+            sha256 TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            document_type TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            classified_at TIMESTAMPTZ
+        );
+    """),
+    (6, "record how attachments were classified", """
+        ALTER TABLE attachment_cache
+        ADD COLUMN IF NOT EXISTS classified_by TEXT,
+        ADD COLUMN IF NOT EXISTS classification_confidence REAL;
+    """),
+    (7, "outbox for outgoing mail", """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id BIGSERIAL PRIMARY KEY,
+            to_address TEXT,
+            reply_to_message_id TEXT,
+            subject TEXT,
+            body TEXT NOT NULL,
+            body_type TEXT NOT NULL DEFAULT 'HTML',
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            locked_until TIMESTAMPTZ,
+            last_error TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            sent_at TIMESTAMPTZ
+        );
+        CREATE INDEX IF NOT EXISTS outbox_due_idx ON outbox (next_attempt_at) WHERE status IN ('pending', 'sending');
+    """),
+    (8, "batch run history for the dashboard", """
+        CREATE TABLE IF NOT EXISTS batch_runs (
+            id BIGSERIAL PRIMARY KEY,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            finished_at TIMESTAMPTZ,
+            status TEXT NOT NULL DEFAULT 'running',
+            results JSONB NOT NULL DEFAULT '[]'::jsonb,
+            logs JSONB NOT NULL DEFAULT '[]'::jsonb,
+            stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+            error TEXT
+        );
+    """),
+    (9, "claim message job queue", """
+        CREATE TABLE IF NOT EXISTS claim_jobs (
+            id BIGSERIAL PRIMARY KEY,
+            message_id TEXT NOT NULL UNIQUE,
+            sender TEXT NOT NULL,
+            received_at TIMESTAMPTZ NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            locked_by TEXT,
+            locked_until TIMESTAMPTZ,
+            heartbeat_at TIMESTAMPTZ,
+            last_error TEXT,
+            result JSONB,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            finished_at TIMESTAMPTZ
+        );
+        CREATE INDEX IF NOT EXISTS claim_jobs_due_idx ON claim_jobs (received_at, id) WHERE status IN ('pending', 'running');
+        CREATE INDEX IF NOT EXISTS claim_jobs_sender_idx ON claim_jobs (sender, received_at, id) WHERE status IN ('pending', 'running');
+    """),
+    (10, "record which message opened a claim's Jira ticket", """
+        ALTER TABLE claims
+        ADD COLUMN IF NOT EXISTS jira_message_id TEXT;
+    """),
+]
+
+
+class ConnectionPool:
+    """Bounded, thread-safe psycopg2 pool that checks idle connections before reuse."""
+
+    def __init__(self, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, health_check_seconds=DB_HEALTH_CHECK_SECONDS, **connect_kwargs):
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self.health_check_seconds = health_check_seconds
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except Exception:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn, close=bool(conn.closed))
+            self._slots.release()
+
+    def _checkout(self):
+        for _ in range(2):
+            conn = self._pool.getconn()
+            idle = time.monotonic() - self._last_used.get(id(conn), 0)
+            if not conn.closed and (idle < self.health_check_seconds or self._is_healthy(conn)):
+                return conn
+            logger.warning("Discarding broken database connection")
+            self._pool.putconn(conn, close=True)
+        return self._pool.getconn()
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def close(self):
+        self._pool.closeall()
+
+
+@registry.register("db_pool")
+def _build_db_pool():
+    return ConnectionPool(
+        dbname=PG_DB,
+        user=PG_USER,
+        password=PG_PASSWORD,
+        host=PG_HOST,
+        port=PG_PORT
+    )
+
+
+def connection():
+    return registry.get("db_pool").connection()
+
+
+def migrate(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+            conn.commit()
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            for version, name, sql in MIGRATIONS:
+                if version in applied:
+                    continue
+                logger.info(f"Applying migration {version}: {name}")
+                cursor.execute(sql)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name)
+                )
+                conn.commit()
+        finally:
+            conn.rollback()
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+
+
+_migrated = False
+_migrate_lock = threading.Lock()
+
+
+def ensure_migrated():
+    global _migrated
+    if _migrated:
+        return
+    with _migrate_lock:
+        if not _migrated:
+            with connection() as conn:
+                migrate(conn)
+            _migrated = True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] != ["migrate"]:
+        print("usage: python db.py migrate")
+        sys.exit(1)
+    ensure_migrated()
+    print(f"Schema is at version {MIGRATIONS[-1][0]}.")
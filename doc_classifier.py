@@ -0,0 +1,123 @@
+import re
+import string
+from dataclasses import dataclass
+from typing import Optional
+
+from config import DOC_CLASSIFIER_THRESHOLD
+
+DECIDED_BY_RULES = "rules"
+DECIDED_BY_LLM = "llm"
+DECIDED_BY_CACHE = "cache"
+
+# Only the start of a document is scanned; that is where the identifying
+# headers and numbers are.
+HEAD_CHARS = 4000
+
+# Weighted rules per checklist document. Each rule is a tuple of phrases
+# (matched as whole words on lowercased text with punctuation removed) or,
+# for number formats, a regex run on the raw text. A document type's score is
+# the sum of the weights of its matching rules, capped at 1.0.
+RULES = {
+    "ssn_card": [
+        (("social security",), 0.5),
+        (r"\b\d{3}-\d{2}-\d{4}\b", 0.4),
+        (("this number has been established for",), 0.3),
+    ],
+    "driver_license": [
+        (("driver license", "drivers license", "driver s license", "driving license", "driving licence",
+          "driver licence"), 0.6),
+        (("dl no", "dl number", "license no", "license number", "licence no", "licence number"), 0.3),
+        (("motor vehicles", "dmv", "rto"), 0.2),
+        (("date of expiry", "expires", "valid till", "valid until"), 0.1),
+    ],
+    "vehicle_registration": [
+        (("vehicle registration", "registration certificate", "registration card"), 0.6),
+        (("vin", "vehicle identification number", "chassis no", "chassis number"), 0.3),
+        (("registration no", "registration number", "license plate", "number plate"), 0.2),
+        (("engine no", "engine number", "make model"), 0.1),
+    ],
+    "accident_report": [
+        (("accident report", "police report", "collision report", "first information report", "fir"), 0.6),
+        (("date of accident", "time of accident", "place of accident", "location of accident",
+          "date of incident", "place of incident", "date of collision"), 0.3),
+        (("investigating officer", "witness", "case no", "case number"), 0.2),
+    ],
+    "death_certificate": [
+        (("certificate of death", "death certificate"), 0.7),
+        (("date of death", "place of death", "cause of death", "deceased", "decedent"), 0.3),
+        (("registrar",), 0.1),
+    ],
+    "medical_records": [
+        (("medical record", "medical records", "discharge summary", "case history", "clinical notes"), 0.5),
+        (("diagnosis", "chief complaint", "history of present illness", "prescribed"), 0.3),
+        (("admission date", "discharge date", "attending physician"), 0.2),
+    ],
+    "doctor_bill": [
+        (("medical bill", "hospital bill", "doctor bill", "doctor s bill", "invoice"), 0.4),
+        (("amount due", "amount payable", "balance due", "total payable", "bill no", "bill number",
+          "invoice no", "invoice number"), 0.4),
+        (("consultation fee", "charges", "itemized", "itemised"), 0.2),
+    ],
+    "doctor_receipt": [
+        (("receipt",), 0.5),
+        (("amount paid", "amount received", "received with thanks", "received from", "payment received",
+          "paid in full"), 0.4),
+        (("receipt no", "receipt number", "mode of payment", "transaction id"), 0.2),
+    ],
+}
+
+_PUNCTUATION_TO_SPACE = str.maketrans({char: " " for char in string.punctuation})
+
+_COMPILED_RULES = {
+    document_type: [
+        (re.compile(rule) if isinstance(rule, str) else tuple(f" {phrase} " for phrase in rule), weight)
+        for rule, weight in rules
+    ]
+    for document_type, rules in RULES.items()
+}
+
+
+@dataclass
+class Classification:
+    document_type: Optional[str]
+    confidence: float
+    scores: dict
+
+    @property
+    def settled(self):
+        return self.document_type is not None
+
+
+def _matches(rule, raw, words):
+    if isinstance(rule, tuple):
+        return any(phrase in words for phrase in rule)
+    return rule.search(raw) is not None
+
+
+def score_document(text: str):
+    raw = text[:HEAD_CHARS]
+    words = " " + " ".join(raw.lower().translate(_PUNCTUATION_TO_SPACE).split()) + " "
+    scores = {}
+    for document_type, rules in _COMPILED_RULES.items():
+        score = sum(weight for rule, weight in rules if _matches(rule, raw, words))
+        if score:
+            scores[document_type] = round(min(score, 1.0), 3)
+    return scores
+
+
+def classify_document(text: str, threshold=DOC_CLASSIFIER_THRESHOLD) -> Classification:
+    """Classify a document from its text without calling the LLM.
+
+    Confidence is the best score minus half the runner-up's, so a bill that
+    also looks like a receipt stays ambiguous. Only documents at or above
+    threshold get a document_type; the rest are left for the LLM.
+    """
+    scores = score_document(text or "")
+    if not scores:
+        return Classification(None, 0.0, scores)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_type, best = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    confidence = round(best - runner_up / 2, 3)
+    return Classification(best_type if confidence >= threshold else None, confidence, scores)
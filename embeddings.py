@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+from config import EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_ENTRIES, EMBEDDING_MODEL, EMBEDDING_THREADS
+
+logger = logging.getLogger(__name__)
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """In-memory LRU of embedding vectors keyed by the SHA-256 of the text."""
+
+    def __init__(self, max_entries=EMBEDDING_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = vector
+        return found
+
+    def set_many(self, items):
+        with self._lock:
+            for key, vector in items.items():
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class QuantizedEmbeddings(Embeddings):
+    """sentence-transformers model with int8 dynamic quantization for CPU workers.
+
+    Linear layers are quantized to int8 at load time, torch uses at most
+    `threads` threads, texts are encoded in batches of `batch_size`, and
+    vectors are cached by text hash so an email body embedded in the batch
+    pass is not embedded again for its query.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, batch_size=EMBEDDING_BATCH_SIZE, threads=EMBEDDING_THREADS,
+                 cache=None, quantize=True):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device="cpu")
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self._torch = torch
+
+    def _encode(self, texts):
+        with self._torch.inference_mode():
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        return [vector.tolist() for vector in vectors]
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keys = [text_key(text) for text in texts]
+        found = self.cache.get_many(dict.fromkeys(keys))
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            computed = dict(zip(missing, self._encode(list(missing.values()))))
+            self.cache.set_many(computed)
+            found.update(computed)
+            logger.debug(f"Embedded {len(missing)} text(s), {len(texts) - len(missing)} from cache")
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
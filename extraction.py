@@ -0,0 +1,195 @@
+import json
+import logging
+import re
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+from metrics import metrics
+from policies import DOCUMENT_TYPES, POLICY_REQUIREMENTS
+
+logger = logging.getLogger(__name__)
+
+MAX_EXTRACTION_ATTEMPTS = 3
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class AttachmentDocument(BaseModel):
+    attachment: int
+    document_type: str
+
+    @field_validator("document_type")
+    @classmethod
+    def check_document_type(cls, value):
+        value = value.strip().lower()
+        if value not in DOCUMENT_TYPES:
+            raise ValueError(f"document_type must be one of {DOCUMENT_TYPES}, got {value!r}")
+        return value
+
+
+class ClaimExtraction(BaseModel):
+    policy_type: Optional[str] = None
+    intent: Literal["claim", "query"] = "claim"
+    fields: dict[str, Optional[str]] = Field(default_factory=dict)
+    patient_summary: str = ""
+    documents: list[AttachmentDocument] = Field(default_factory=list)
+
+    @field_validator("policy_type", mode="before")
+    @classmethod
+    def normalize_policy_type(cls, value):
+        if not value:
+            return None
+        value = str(value).strip().lower()
+        if value not in POLICY_REQUIREMENTS:
+            return None
+        return value
+
+    @field_validator("intent", mode="before")
+    @classmethod
+    def normalize_intent(cls, value):
+        return str(value or "claim").strip().lower()
+
+    @field_validator("fields", mode="before")
+    @classmethod
+    def stringify_fields(cls, value):
+        if not isinstance(value, dict):
+            return value
+        return {
+            key: str(field_value).strip() if field_value not in (None, "") else None
+            for key, field_value in value.items()
+        }
+
+    @property
+    def provided_documents(self):
+        return sorted({doc.document_type for doc in self.documents})
+
+    def claim_data(self):
+        data = {"policy_type": self.policy_type}
+        data.update({key: value for key, value in self.fields.items() if value})
+        data["patient_summary"] = self.patient_summary
+        data["intent"] = self.intent
+        return data
+
+    def document_data(self):
+        return {"provided_documents": self.provided_documents}
+
+
+def strip_code_fences(text: str) -> str:
+    return re.sub(r"```(?:json)?\s*([\s\S]*?)\s*```", r"\1", text).strip()
+
+
+def format_attachments(attachments, identified=None):
+    if not attachments:
+        return "No PDF attachments were provided."
+    identified = identified or {}
+    return "\n\n".join(
+        f"Attachment {number} ({name}, already identified as {identified[number]}):\n{text}"
+        if number in identified else f"Attachment {number} ({name}):\n{text}"
+        for number, (name, text) in enumerate(attachments, start=1)
+    )
+
+
+def format_known_fields(known_fields):
+    if not known_fields:
+        return ""
+    return f"""
+    These fields were read from the email and documents by pattern matching; return them, correcting any the text contradicts:
+    {json.dumps(known_fields)}
+    """
+
+
+def build_extraction_prompt(email_body, policy_context, attachments, identified=None, known_fields=None):
+    field_lines = "\n".join(
+        f"    {policy_type.capitalize()} fields: {json.dumps(requirements['fields'])}"
+        for policy_type, requirements in POLICY_REQUIREMENTS.items()
+    )
+    doc_lines = "\n".join(
+        f"    {policy_type.capitalize()} docs: {json.dumps(requirements['documents'])}"
+        for policy_type, requirements in POLICY_REQUIREMENTS.items()
+    )
+    return f"""
+    You are an insurance claim processor.
+    Act like an insurance agent who knows all policy plans.
+
+    Use the following policy reference/context:
+    {policy_context}
+
+    Email body:
+    {email_body}
+
+    Text extracted from the PDF attachments:
+    {format_attachments(attachments, identified)}
+
+    1. Detect policy type:
+    - Mediclaim / health insurance → "health"
+    - Accident / vehicle insurance → "vehicle"
+    - Life insurance → "life"
+    Use null if the policy type cannot be determined.
+
+    2. Detect intent: "claim" if the customer wants to file or continue a claim, "query" if they only ask about policies.
+
+    3. Extract all claim fields from the email body and attachments. Use exact field names from the checklist:
+{field_lines}
+    {format_known_fields(known_fields)}
+    4. Detect which documents are provided, analyzing ONLY the attachment text. Use exact checklist names:
+{doc_lines}
+    Report one entry per recognized attachment, using the attachment number.
+    Attachments marked as already identified need no entry.
+
+    5. Provide a minimal patient/claim summary.
+
+    Return JSON ONLY in this format:
+    {{
+        "policy_type": "health" | "vehicle" | "life" | null,
+        "intent": "claim" | "query",
+        "fields": {{"<field_name>": "<value>"}},
+        "patient_summary": "...",
+        "documents": [{{"attachment": 1, "document_type": "<checklist name>"}}]
+    }}
+    """
+
+
+def build_repair_prompt(prompt, bad_output, error):
+    return f"""
+    {prompt}
+
+    Your previous response could not be used:
+    {bad_output}
+
+    Validation error:
+    {error}
+
+    Return the corrected JSON ONLY, following the format above exactly.
+    """
+
+
+def parse_extraction(content: str) -> ClaimExtraction:
+    return ClaimExtraction.model_validate_json(strip_code_fences(content))
+
+
+def extract_claim(
+    llm, email_body, policy_context, attachments, identified=None, known_fields=None, max_attempts=MAX_EXTRACTION_ATTEMPTS
+):
+    prompt = build_extraction_prompt(email_body, policy_context, attachments, identified, known_fields)
+    current_prompt = prompt
+    error = None
+
+    for attempt in range(1, max_attempts + 1):
+        content = llm.invoke(current_prompt).content
+        try:
+            extraction = parse_extraction(content)
+            # The model saw the whole text; its values win over the regex prefill.
+            extraction.fields = {**(known_fields or {}), **{k: v for k, v in extraction.fields.items() if v}}
+            return extraction
+        except ValidationError as e:
+            error = e
+            if hasattr(llm, "discard"):
+                llm.discard(current_prompt)
+            logger.warning(f"Invalid extraction output (attempt {attempt}/{max_attempts}): {e}")
+            metrics.incr("retries", stage="extraction")
+            current_prompt = build_repair_prompt(prompt, content, e)
+
+    raise ExtractionError(f"Claim extraction failed after {max_attempts} attempts: {error}")
@@ -0,0 +1,176 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Optional
+
+from policies import POLICY_REQUIREMENTS, get_required_fields
+
+# Separator between a label and its value, e.g. "Policy No: ", "DOB - ", "date of death was ".
+_SEPARATOR = r"\s*(?:[:=#\-]|\bis\b|\bwas\b|\bon\b)?\s*"
+
+_VALUE_PATTERNS = {
+    "date": r"(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}"
+            r"|\d{1,2}(?:st|nd|rd|th)?\s+[A-Za-z]{3,9},?\s+\d{4}|[A-Za-z]{3,9}\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4})",
+    # Up to four capitalized words on one line; a word that starts another
+    # label ("Policy Number", "Date of birth") ends the name. Built below.
+    "name": None,
+    "identifier": r"([A-Za-z0-9][A-Za-z0-9/-]{3,24})",
+    "plate": r"([A-Z]{2}[ -]?\d{1,2}[ -]?[A-Z]{0,3}[ -]?\d{1,4}\b|[A-Za-z0-9][A-Za-z0-9-]{3,12})",
+}
+
+FIELD_LABELS = {
+    "policy_number": ("identifier", r"policy\s*(?:number|no\.?|#|id)"),
+    "vehicle_number": ("plate", r"(?:vehicle|registration|reg\.?|plate)\s*(?:number|no\.?|#)|license\s+plate"),
+    "patient_name": ("name", r"patient(?:'s)?\s+name|name\s+of\s+(?:the\s+)?patient"),
+    "owner_name": ("name", r"owner(?:'s)?\s+name|name\s+of\s+(?:the\s+)?owner|registered\s+owner"),
+    "beneficiary_name": ("name", r"beneficiary(?:'s)?\s+name|name\s+of\s+(?:the\s+)?beneficiary|nominee(?:'s)?\s+name"),
+    "date_of_birth": ("date", r"date\s+of\s+birth|birth\s*date|\bd\.?o\.?b\.?"),
+    "treatment_date": ("date", r"(?:date\s+of\s+(?:treatment|admission|service)|treatment\s+date|admission\s+date)"),
+    "accident_date": ("date", r"(?:date\s+of\s+(?:the\s+)?(?:accident|incident)|(?:accident|incident)\s+date)"),
+    "death_date": ("date", r"(?:date\s+of\s+death|death\s+date|died\s+on)"),
+}
+
+_LABEL_WORDS = r"policy|vehicle|registration|date|dob|claim|amount|phone|mobile|email|address|hospital"
+_NEXT_LABEL = "|".join([_LABEL_WORDS, *(label for _, label in FIELD_LABELS.values())])
+_VALUE_PATTERNS["name"] = (
+    rf"((?!(?i:{_NEXT_LABEL})\b)[A-Z][A-Za-z'-]+(?:[ \t]+(?!(?i:{_NEXT_LABEL})\b)[A-Z][A-Za-z'-]+){{0,3}})"
+)
+
+_FIELD_REGEXES = {
+    name: re.compile(rf"(?i:{label}){_SEPARATOR}{_VALUE_PATTERNS[kind]}")
+    for name, (kind, label) in FIELD_LABELS.items()
+}
+
+_UNAMBIGUOUS_DATE_FORMATS = ("%Y-%m-%d", "%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y")
+_NUMERIC_DATE = re.compile(r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})")
+
+POLICY_KEYWORDS = {
+    "health": re.compile(r"\b(?:health|mediclaim|medical|hospital(?:ized|isation|ization)?|treatment)\b", re.IGNORECASE),
+    "vehicle": re.compile(r"\b(?:vehicle|car|bike|motor|accident)\b", re.IGNORECASE),
+    "life": re.compile(r"\b(?:life\s+(?:insurance|policy|cover)|death|deceased|passed\s+away|beneficiary)\b", re.IGNORECASE),
+}
+CLAIM_KEYWORDS = re.compile(r"\b(?:claim|reimburse(?:ment)?|attached|enclosed|submit(?:ting)?)\b", re.IGNORECASE)
+
+
+def normalize_date(value: str) -> Optional[str]:
+    """Return value as YYYY-MM-DD, or None if it is invalid or day/month order is ambiguous."""
+    value = re.sub(r"(\d)(?:st|nd|rd|th)\b", r"\1", value.replace(",", " "))
+    value = " ".join(value.split())
+
+    match = _NUMERIC_DATE.fullmatch(value)
+    if match:
+        first, second, year = (int(part) for part in match.groups())
+        if year < 100:
+            year += 2000 if year <= date.today().year % 100 else 1900
+        if first <= 12 and second <= 12 and first != second:
+            return None
+        day, month = (second, first) if second > 12 else (first, second)
+        try:
+            parsed = date(year, month, day)
+        except ValueError:
+            return None
+    else:
+        for fmt in _UNAMBIGUOUS_DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt).date()
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+
+    if parsed > date.today() or parsed.year < 1900:
+        return None
+    return parsed.isoformat()
+
+
+def _normalize_identifier(value: str) -> Optional[str]:
+    value = re.sub(r"\s+", "", value).upper()
+    if not re.search(r"\d", value) or len(value) < 4:
+        return None
+    return value
+
+
+def _normalize(kind, value):
+    if kind == "date":
+        return normalize_date(value)
+    if kind in ("identifier", "plate"):
+        return _normalize_identifier(value)
+    return " ".join(value.split())
+
+
+def extract_field(name, texts):
+    """Find one consistent value for field name across texts.
+
+    Returns (value, sources): the value, or None if absent or conflicting,
+    and how many of the texts contain it.
+    """
+    kind = FIELD_LABELS[name][0]
+    values = set()
+    sources = 0
+    for text in texts:
+        found = {value for value in (_normalize(kind, m.group(1)) for m in _FIELD_REGEXES[name].finditer(text)) if value}
+        values |= found
+        sources += bool(found)
+    return (values.pop(), sources) if len(values) == 1 else (None, 0)
+
+
+def detect_policy_type(email_body, document_types=()):
+    candidates = {policy_type for policy_type, pattern in POLICY_KEYWORDS.items() if pattern.search(email_body)}
+    for document_type in document_types:
+        owners = {
+            policy_type for policy_type, requirements in POLICY_REQUIREMENTS.items()
+            if document_type in requirements["documents"]
+        }
+        if len(owners) == 1:
+            candidates |= owners
+    return candidates.pop() if len(candidates) == 1 else None
+
+
+def detect_intent(email_body, has_attachments):
+    if has_attachments or CLAIM_KEYWORDS.search(email_body):
+        return "claim"
+    return None
+
+
+@dataclass
+class FieldExtraction:
+    policy_type: Optional[str]
+    intent: Optional[str]
+    fields: dict = field(default_factory=dict)
+    # Names read from a single source; a regex cannot tell where a name ends
+    # reliably enough to skip the LLM on one sighting.
+    unconfirmed: set = field(default_factory=set)
+
+    @property
+    def missing_fields(self):
+        if not self.policy_type:
+            return None
+        return [name for name in get_required_fields(self.policy_type) if not self.fields.get(name)]
+
+    @property
+    def complete(self):
+        return self.intent == "claim" and self.missing_fields == [] and not self.unconfirmed
+
+
+def extract_fields(email_body, attachment_texts=(), document_types=()):
+    """Deterministically fill what can be read from the email and attachments.
+
+    Only fields with a single valid value across all sources are returned;
+    anything missing or conflicting is left for the LLM. Names found in only
+    one source are returned but marked unconfirmed, so they never make the
+    extraction complete on their own.
+    """
+    policy_type = detect_policy_type(email_body, document_types)
+    names = get_required_fields(policy_type) if policy_type else list(FIELD_LABELS)
+    texts = [email_body, *attachment_texts]
+    fields = {}
+    unconfirmed = set()
+    for name in names:
+        if name in FIELD_LABELS:
+            value, sources = extract_field(name, texts)
+            if value:
+                fields[name] = value
+                if FIELD_LABELS[name][0] == "name" and sources < 2:
+                    unconfirmed.add(name)
+    return FieldExtraction(policy_type, detect_intent(email_body, bool(attachment_texts)), fields, unconfirmed)
@@ -1,687 +1,888 @@
-import os
-import json
-import re
-from datetime import datetime, timedelta
-from O365 import Account
-from jira import JIRA
-import psycopg2
-import io
-from PyPDF2 import PdfReader
-from dotenv import load_dotenv
-from langchain_community.agent_toolkits.office365.toolkit import O365Toolkit
-from langchain_community.tools.office365.create_draft_message import O365CreateDraftMessage
-from langchain_community.tools.office365.events_search import O365SearchEvents
-from langchain_community.tools.office365.messages_search import O365SearchEmails
-from langchain_community.tools.office365.send_event import O365SendEvent
-from langchain_community.tools.office365.send_message import O365SendMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.chains import RetrievalQA
-from requests.exceptions import ReadTimeout, RequestException
-import time
-import logging
-from pdf2image import convert_from_bytes
-import pytesseract
-from PIL import Image
-import io
-import pdfplumber
-import base64
-import tempfile
-import fitz
-
-load_dotenv()
-
-CLIENT_ID = os.getenv("CLIENT_ID")
-CLIENT_SECRET = os.getenv("CLIENT_SECRET")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-JIRA_SERVER = os.getenv("JIRA_SERVER")
-JIRA_USER = os.getenv("JIRA_USER")
-JIRA_TOKEN = os.getenv("JIRA_TOKEN")
-JIRA_PROJECT_KEY = os.getenv("JIRA_PROJECT_KEY")
-
-PG_HOST = os.getenv("PG_HOST")
-PG_PORT = os.getenv("PG_PORT")
-PG_USER =  os.getenv("PG_USER")
-PG_PASSWORD = os.getenv("PG_PASSWORD")
-PG_DB = os.getenv("PG_DB")
-
-REDIRECT_URI = "http://localhost:5300"
-SCOPES = [
-    'https://graph.microsoft.com/Mail.Read',
-    'https://graph.microsoft.com/Mail.ReadWrite',
-    'https://graph.microsoft.com/Mail.Send',
-    'https://graph.microsoft.com/User.Read',
-    'offline_access'
-]
-
-
-credentials = (CLIENT_ID, CLIENT_SECRET)
-account = Account(credentials)
-if not account.is_authenticated:
-    account.authenticate(scopes=SCOPES, redirect_uri=REDIRECT_URI)
-
-O365CreateDraftMessage.model_rebuild()
-O365SearchEvents.model_rebuild()
-O365SearchEmails.model_rebuild()
-O365SendEvent.model_rebuild()
-O365SendMessage.model_rebuild()
-toolkit = O365Toolkit(account=account)
-tools = toolkit.get_tools()
-
-
-llm = ChatGoogleGenerativeAI(
-    google_api_key=GOOGLE_API_KEY,
-    model="models/gemini-2.5-flash-lite-preview-06-17",
-    temperature=0,
-    max_output_tokens=2048,
-    timeout=60
-)
-
-
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-jira_options = {"server": JIRA_SERVER}
-jira = JIRA(options=jira_options, basic_auth=(JIRA_USER, JIRA_TOKEN), timeout=30)
-
-def get_connection():
-    return psycopg2.connect(
-        dbname=PG_DB,
-        user=PG_USER,
-        password=PG_PASSWORD,
-        host=PG_HOST,
-        port=PG_PORT
-    )
-
-
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vectorstore = Chroma(
-    persist_directory="policy_vector_db",
-    embedding_function=embedding_model
-)
-retriever = vectorstore.as_retriever(search_kwargs={"k": 2})
-
-
-    
-def process_jira_updates():
-   
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    
-    cursor.execute("""
-        SELECT id, email, jira_ticket, status, claim_data
-        FROM claims
-        WHERE status='submitted'
-    """)
-    claims = cursor.fetchall()
-    results = []
-    for claim_id, email, jira_ticket, status, claim_data_json in claims:
-        if isinstance(claim_data_json, str):
-            claim_data = json.loads(claim_data_json)
-        else:
-            claim_data = claim_data_json
-
-
-        issue = jira.issue(jira_ticket)
-        issue_status = issue.fields.status.name.lower()
-
-        
-        if issue_status in ['approved', 'done', 'processed']:
-            subject = "Your Insurance Claim has been Processed"
-            body = f"""
-            Dear Customer,
-
-             Your insurance claim for policy {claim_data.get('policy_number')} has been processed successfully. 
-            The amount approved will reflect in your account within 24-48 hours.
-
-            Thank you for choosing StatusNeo Insurance.
-            """
-            new_status = 'processed'
-
-        elif issue_status in ['declined', 'rejected']:
-            subject = "Your Insurance Claim has been Declined"
-            body = f"""
-            Dear Customer,
-
-            We regret to inform you that your insurance claim for policy {claim_data.get('policy_number')} has been declined.
-
-            For more details, please contact our support team.
-
-            Thank you,
-            StatusNeo Insurance
-            """
-            new_status = 'declined'
-        else:
-            continue  
-
-        mailbox = account.mailbox()
-        message = mailbox.new_message()
-        message.to.add(email)
-        message.subject = subject
-        message.body = body
-        message.send()
-
-        
-        cursor.execute(
-            "UPDATE claims SET status=%s WHERE id=%s",
-            (new_status, claim_id)
-        )
-        conn.commit()
-        results.append({
-            "email": email,
-            "status": new_status,
-            "jira_ticket": jira_ticket
-        })
-
-    cursor.close()
-    conn.close()
-    return results
-def parse_json_response(response):
-    try:
-        cleaned = re.sub(r"```(?:json)?\s*([\s\S]*?)\s*```", r"\1", response.content).strip()
-        return json.loads(cleaned)
-    except Exception as e:
-        print(f" Invalid JSON: {e}")
-        return {}
-def format_html_email(content: str, company_name: str = "AIG Team") -> str:
-    return f"""
-    <html>
-      <body style="font-family: Calibri, Arial, sans-serif; color: #222; line-height: 1.6; font-size: 15px; background-color:#f9f9f9; padding:20px;">
-        <div style="background-color:#fff; border:1px solid #ddd; border-radius:8px; padding:20px; max-width:600px; margin:auto;">
-          <p>{content.replace('\n', '<br>')}</p>
-          <br>
-          <p style="font-size: 13px; color: #555;">
-            Regards,<br><b>{company_name}</b>
-          </p>
-        </div>
-      </body>
-    </html>
-    """
-
-
-
-
-
-def process_claims():
-    mailbox = account.mailbox()
-    inbox = mailbox.inbox_folder()
-    one_hour_ago = datetime.now() - timedelta(minutes=20)
-    query = inbox.new_query().greater_equal('receivedDateTime', one_hour_ago)
-    messages = inbox.get_messages(limit=10, query=query, download_attachments=True)
-
-
-
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-    ALTER TABLE claims
-    ADD COLUMN IF NOT EXISTS document_data JSONB DEFAULT '{}'::jsonb;
-    """)
-    
-
-    batch_log = []
-
-    POLICY_REQUIREMENTS = {
-        "health": {
-            "documents": ["ssn_card", "doctor_bill", "doctor_receipt"],
-            "fields": ["patient_name", "policy_number", "date_of_birth", "treatment_date"]
-        },
-        "vehicle": {
-            "documents": ["driver_license", "vehicle_registration", "accident_report"],
-            "fields": ["owner_name", "policy_number", "vehicle_number", "accident_date"]
-        },
-        "life": {
-            "documents": ["ssn_card", "death_certificate", "medical_records"],
-            "fields": ["beneficiary_name", "policy_number", "date_of_birth", "death_date"]
-        }
-    }
-
-    def get_required_documents(policy_type: str):
-        return POLICY_REQUIREMENTS.get(policy_type, {}).get("documents", [])
-
-    def get_required_fields(policy_type: str):
-        return POLICY_REQUIREMENTS.get(policy_type, {}).get("fields", [])
-
-    for msg in messages:
-       
-        
-        email = msg.sender.address if msg.sender else None
-        email_body = msg.body or ""
-        if not email:
-            continue
-        
-        cursor.execute("SELECT id FROM claims WHERE email=%s", (email,))
-        user_exists = cursor.fetchone()
-        if not user_exists:
-            print(f"Email {email} not found in database. Skipping.")
-            mailbox = account.mailbox()
-            reply_msg = mailbox.new_message()
-            reply_msg.to.add(email)
-            reply_msg.subject = "Unable to Process Your Request"
-            reply_msg.body = format_html_email("""
-            Dear Customer,
-
-            We noticed that your email ID is not registered with us. To access our insurance services and manage your policies, please sign up using your email ID.
-
-            We look forward to serving you and helping you protect what matters most.
-
-            Thank you,
-            """)
-            reply_msg.body_type = 'HTML'
-
-            reply_msg.send()
-            batch_log.append({"email": email, "status": "not_verfied_user"})
-            continue
-        
-        ATTACHMENT_DIR = "Attachments"
-        os.makedirs(ATTACHMENT_DIR, exist_ok=True)
-
-        attachments_data = []
-        non_pdf_files = []
-
-        if msg.has_attachments:
-            for att in msg.attachments:
-                filename = att.name
-
-                
-                if not filename.lower().endswith('.pdf'):
-                    non_pdf_files.append(filename)
-                    continue
-
-                try:
-                    file_bytes = att.content
-                    if isinstance(file_bytes, str):
-                        file_bytes = base64.b64decode(file_bytes)
-
-                    
-                    name, ext = os.path.splitext(filename)
-                    unique_name = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{ext}"
-                    save_path = os.path.join(ATTACHMENT_DIR, unique_name)
-
-                    
-                    with open(save_path, "wb") as f:
-                        f.write(file_bytes)
-
-                    attachments_data.append(save_path)
-                    print(f" Saved {filename} as {unique_name}")
-
-                except Exception as e:
-                    print(f" Failed to save {filename}: {e}")
-        else:
-            print("No attachments to fetch.")
-        
-        combined_pdf_text = ""
-
-        for pdf_path in attachments_data:
-            try:
-                with fitz.open(pdf_path) as doc:
-                    pdf_text = ""
-                    for page in doc:
-                        pdf_text += page.get_text()
-                print(f"Extracted text from {os.path.basename(pdf_path)}:\n{pdf_text[:500]}")
-                combined_pdf_text += pdf_text + "\n" 
-            except Exception as e:
-                print(f" Error extracting from {pdf_path}: {e}")
-
-        
-                
-        if non_pdf_files:
-            prompt = f"""
-            Write a professional email (no subject, no greeting name) informing the customer:
-            The following attachments are not in PDF format: {non_pdf_files}.
-            Please resend all attachments in PDF format.
-             Strict Rules:
-            - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
-            - DO NOT use any Markdown syntax.
-            - Write in plain professional text only, suitable for Outlook email body.
-            - Keep the tone formal, concise, and customer-friendly.
-            Company: StatusNeo Insurance.
-            """
-            response = llm.invoke(prompt)
-            reply_msg = msg.reply()
-            reply_msg.body = format_html_email(response.content)
-            reply_msg.body_type = 'HTML'
-
-            reply_msg.send()
-            batch_log.append({"email": email, "status": "rejected_non_pdf", "files": non_pdf_files})
-            continue
-
-        
-        
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=retriever,
-            return_source_documents=True
-        )
-        qa_result = qa_chain.invoke(email_body)
-        policy_context = qa_result['result']
-        source_docs = qa_result['source_documents']
-
-       
-       
-        
-        prompt_claim = f"""
-        You are an insurance claim processor.
-        Act like an insurance agent who knows all policy plans.
-        and extract the info about the policies.
-
-        Use the following policy reference/context:
-        {policy_context}
-
-        Email body:
-        {email_body}
-
-        Check for policy type, required feilds and intent like if someone wants to get claim or just want
-        to query something.
-
-        1. Detect policy type:
-        - Mediclaim / health insurance → "health"
-        - Accident / vehicle insurance → "vehicle"
-        - Life insurance → "life"
-        Return the policy_type in lowercase exactly as above.
-
-        2. Extract all claim fields. Use **exact field names** from the checklist:
-        Health fields: ["patient_name", "policy_number", "date_of_birth", "treatment_date"]
-        Vehicle fields: ["owner_name", "policy_number", "vehicle_number", "accident_date"]
-        Life fields: ["beneficiary_name", "policy_number", "date_of_birth", "death_date"]
-
-        3. Provide a minimal patient/claim summary.
-
-        Always return JSON ONLY in this format:
-        {{
-            "policy_type": "...",
-            ... extracted fields ...,
-            "patient_summary": "..."
-            "intent": "claim" or "query"
-        }}
-        """
-        
-        response_claim = llm.invoke(prompt_claim)
-
-        
-        prompt_docs = f"""
-            Detect which documents are provided.
-            Analyze ONLY the following text extracted from PDF attachments:
-            {combined_pdf_text}
-
-            Use exact checklist names:
-
-            Health docs: ["ssn_card", "doctor_bill", "doctor_receipt"]
-            Vehicle docs: ["driver_license", "vehicle_registration", "accident_report"]
-            Life docs: ["ssn_card", "death_certificate", "medical_records"]
-
-            Return ONLY a JSON in this format:
-            {{
-            "provided_documents": ["..."]
-            }}
-            """
-
-        document_response = llm.invoke(prompt_docs)
-      
-        
-        document_data = parse_json_response(document_response)
-        
-        
-        print(" Document Fields & Info:", document_data)
-        
-        
-        claim_data = parse_json_response(response_claim)
-        print(" Parsed Claim Data:", claim_data)
-        
-        
-
-        intent = claim_data.get("intent", "claim").lower()
-        print(f" Detected intent: {intent}")
-
-        if intent == "query":
-
-            prompt_agent = f"""
-            you are a insurance agent who knows all policy plans.{policy_context}
-            start the mail with dear member,
-            and tell them whole about the policy plan and dont make it to long just give them short summary about plans.
-            that he or she wants to know about.
-            be very professional in your font.
-            Strict Rules:
-            - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
-            - DO NOT use any Markdown syntax.
-            - Write in plain professional text only, suitable for Outlook email body.
-            - Keep the tone formal, concise, and customer-friendly.
-            company name: AIG team.
-
-            """
-            query_agent = llm.invoke(prompt_agent)
-            reply_msg = msg.reply()
-            reply_msg.body = format_html_email(query_agent.content)
-            reply_msg.body_type = 'HTML'
-
-            reply_msg.subject = "Information Regarding Your Insurance Query"
-            reply_msg.send()
-            batch_log.append({"email": email, "status": "replied_query"})
-            continue 
-
-        cursor.execute(
-            "SELECT claim_data, document_data, status FROM claims WHERE email=%s",
-            (email,)
-        )
-        existing_claim = cursor.fetchone()
-        print("existing claim fetched from db:")
-
-        if existing_claim:
-            existing_claim_json, existing_doc_json, status = existing_claim
-
-            try:
-                if isinstance(existing_claim_json, dict):
-                    existing_claim_data = existing_claim_json
-                elif existing_claim_json:
-                    existing_claim_data = json.loads(existing_claim_json)
-                else:
-                    existing_claim_data = {}
-            except Exception:
-                existing_claim_data = {}
-
-            try:
-                if isinstance(existing_doc_json, dict):
-                    existing_document_data = existing_doc_json
-                elif existing_doc_json:
-                    existing_document_data = json.loads(existing_doc_json)
-                else:
-                    existing_document_data = {}
-            except Exception:
-                existing_document_data = {}
-
-        
-            for key, value in (claim_data or {}).items():
-                if value:
-                    existing_claim_data[key] = value
-
-            claim_data_final = existing_claim_data
-
-            existing_docs = set(existing_document_data.get("provided_documents", []))
-            new_docs = set((document_data or {}).get("provided_documents", []))
-            all_docs = list(existing_docs.union(new_docs))
-            document_data_final = {"provided_documents": all_docs}
-            print("document if statement is executed")
-
-        else:
-            claim_data_final = claim_data or {}
-            document_data_final = document_data or {}
-            print("document if statement is not executed")
-
-        print(" Claim Fields & Info:")
-        print(json.dumps(claim_data_final, indent=2))
-
-        print(" Provided Documents:")
-        print(json.dumps(document_data_final, indent=2))
-
-        
-        policy_type = claim_data_final.get("policy_type", "unknown")
-
-        policy_type = claim_data_final.get("policy_type")
-
-        if not policy_type or policy_type.lower() not in POLICY_REQUIREMENTS:
-            print(f" Unknown or missing policy type for {email}. Sending clarification email.")
-
-            mailbox = account.mailbox()
-            reply_msg = mailbox.new_message()
-            reply_msg.to.add(email)
-            reply_msg.subject = "Unable to Process Your query - Clarification Needed"
-            reply_msg.body = """
-            <html>
-            <body style="font-family: Arial, sans-serif; color: #333; line-height: 1.6;">
-                <p>Dear Customer,</p>
-                <p>
-                We could not determine the type of your insurance policy or what kind of claim/query you are making
-                 based on your recent email.
-                </p>
-                <p>
-                Please reply with your policy type or provide relevant documents so we can proceed with your claim.
-                </p>
-                <p>Thank you for choosing <b>AIG</b>.</p>
-                <br>
-                <p>Best regards,<br>
-                <b>AIG Team</b></p>
-            </body>
-            </html>
-            """
-            reply_msg.body_type = 'HTML'
-            reply_msg.send()
-
-            batch_log.append({"email": email, "status": "unclear_messeage"})
-            continue  
-
-        required_fields = get_required_fields(policy_type)
-        missing_fields = [f for f in required_fields if not claim_data_final.get(f)]
-
-        required_docs = get_required_documents(policy_type)
-        missing_docs = [d for d in required_docs if d not in document_data_final.get("provided_documents", [])]
-
-        
-
-        
-        cursor.execute(
-            """
-            UPDATE claims
-            SET claim_data = %s, document_data = %s
-            WHERE email = %s
-            """,
-            (json.dumps(claim_data_final), json.dumps(document_data_final), email)
-        )
-        conn.commit()
-
-        if missing_docs or missing_fields:
-            prompt_missing = f"""
-            start the mail with dear member,
-            {policy_context} give a short description of the policy that user wants to claim.
-            Write a professional email (no subject, no greeting name) informing the customer:
-            The following required documents/fields are missing:
-            Documents: {missing_docs}
-            Fields: {missing_fields}
-            Company: AIG team
-            Strict Rules:
-            - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
-            - DO NOT use any Markdown syntax.
-            - Write in plain professional text only, suitable for Outlook email body.
-            - Keep the tone formal, concise, and customer-friendly.
-            """
-            response_missing = llm.invoke(prompt_missing)
-            reply_msg = msg.reply()
-            reply_msg.subject = "Additional Information Required for Your Insurance Claim"
-            reply_msg.body = format_html_email(response_missing.content)
-            reply_msg.body_type = 'HTML'
-
-            reply_msg.send()
-
-            status = "pending" 
-           
-            batch_log.append({"email": email, "status": status, "missing_documents": missing_docs, "missing_fields": missing_fields})
-            continue
-
-        else:
-            prompt_jira = f"""
-        
-            {policy_context} give a short description of the policy that user wants to claim.
-            mailing to get the information about our policy plans and all just tell them about that.
-            The customer sent an email and attached PDF documents: #add attachments here
-            The extracted claim data is:
-
-            {json.dumps(claim_data_final, indent=2)}
-            {json.dumps(document_data_final, indent=2)}
-
-            {combined_pdf_text}
-            Provide a comprehensive, human-friendly Jira ticket description including:
-            1. Patient/incident history
-            2. Summarize each document and give each and every key values means give every possible information
-            also add the extract numbers and details mentioned in documents.
-            that you have got but in clean and precise way act like insurance claim head.
-            3. short AI assessment of claim eligibility and suggested claimable amount
-            4. what can be the next steps.
-            Make it clear and easy for a human to process.
-            Strict Rules:
-            - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
-            - DO NOT use any Markdown syntax.
-            - Write in plain professional text only, suitable for Outlook email body, use only bullets if needed.
-            - Keep the tone formal, concise, and customer-friendly.
-            - dont add date or time in jira description.
-            - all documents and summary is there that is needed to claim just human loop have to verify it write according to it.
-            - use from: Insurance Engine.
-            company name: AIG team.
-            """
-            jira_description = llm.invoke(prompt_jira).content
-
-            issue_dict = {
-                'project': {'key': JIRA_PROJECT_KEY},
-                'summary': f"Insurance Claim - {claim_data_final.get('policy_number')}",
-                'description': jira_description,
-                'issuetype': {'name': 'Task'}
-            }
-
-            def create_issue_with_retries(jira_client, issue_dict, max_retries=3, delay=5):
-                for attempt in range(1, max_retries + 1):
-                    try:
-                        return jira_client.create_issue(fields=issue_dict)
-                    except ReadTimeout:
-                        logger.warning(f"Jira create_issue timed out (attempt {attempt}/{max_retries}). Retrying in {delay}s...")
-                        time.sleep(delay)
-                    except RequestException as e:
-                        logger.error(f"Jira request error: {e}")
-                        time.sleep(delay)
-                    except Exception as e:
-                        logger.exception(f"Unexpected Jira error: {e}")
-                        raise
-                raise RuntimeError("Failed to create Jira issue after multiple retries")
-            
-            issue = create_issue_with_retries(jira, issue_dict)
-
-            prompt_mail = f"""
-            Write a professional email (no subject, no greeting name) informing the customer:
-            Their claim has been submitted successfully.
-            Reference Ticket ID: {issue.key}.
-            Company: AIG team.
-            Strict Rules:
-            - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
-            - DO NOT use any Markdown syntax.
-            - Write in plain professional text only, suitable for Outlook email body.
-            - Keep the tone formal, concise, and customer-friendly.
-            """
-            response_mail = llm.invoke(prompt_mail)
-            reply_msg = msg.reply()
-            reply_msg.body = format_html_email(response_mail.content)
-            reply_msg.body_type = 'HTML'
-
-            reply_msg.send()
-            
-            cursor.execute("UPDATE claims SET jira_ticket=%s, status=%s WHERE email=%s",
-            (issue.key, "submitted", email))
-            
-            conn.commit()
-        
-            batch_log.append({"email": email, "status": "submitted", "jira_ticket": issue.key})
-
-    cursor.close()
-
-    conn.close()
-    return batch_log
+import json
+from datetime import datetime, timedelta
+from psycopg2.extras import execute_values
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import base64
+
+from config import (
+    CLAIM_JOB_BATCH_SIZE,
+    CLAIM_WORKERS,
+    JIRA_POLL_OVERLAP_MINUTES,
+    JIRA_POLL_UPDATED_ONLY,
+    JIRA_PROJECT_KEY,
+    JIRA_SEARCH_CHUNK_SIZE,
+    MAIL_INITIAL_LOOKBACK_MINUTES,
+    MAIL_PAGE_SIZE,
+    MAILBOX_FETCH_LOCK_ID,
+    MAIL_SYNC_OVERLAP_MINUTES,
+    TOKEN_BUDGET_EXTRACTION,
+    TOKEN_BUDGET_JIRA,
+)
+from attachment_store import (
+    UNRECOGNIZED_DOCUMENT,
+    lookup_cached,
+    save_document_types,
+    save_texts,
+    store_attachment,
+)
+from claim_writes import ClaimWriteBuffer, merge_claim, record_outcomes, record_ticket, submitted_ticket
+from db import connection, ensure_migrated
+from doc_classifier import DECIDED_BY_CACHE, DECIDED_BY_LLM, DECIDED_BY_RULES, classify_document
+from extraction import ClaimExtraction, extract_claim
+from field_extractor import extract_fields
+from job_queue import ClaimJobQueue, enqueue as enqueue_jobs
+from mail_dispatcher import wake_dispatcher
+from llm_cache import placeholder, render_template
+from metrics import metrics
+from outbox import enqueue, new_mail, reply_mail
+from pdf_extract import extract_many
+from policies import POLICY_REQUIREMENTS, get_required_documents, get_required_fields
+from resilience import guarded
+from services import registry
+from step_graph import StepGraph
+from token_budget import fit_attachments, summarize_to_budget
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_LAZY_SERVICES = {
+    "account": "account",
+    "tools": "o365_tools",
+    "llm": "llm",
+    "jira": "jira",
+    "embedding_model": "embedding_model",
+    "vectorstore": "vectorstore",
+    "retriever": "retriever",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_SERVICES:
+        return registry.get(_LAZY_SERVICES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+JIRA_POLL_CURSOR = "jira_status_poll"
+
+CONFIRMATION_FALLBACK = (
+    "Dear Member,\n\nYour claim has been submitted successfully. "
+    "Your reference ticket ID is {ticket_id}. We will keep you informed of its progress."
+)
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@metrics.timed("jira_search")
+def fetch_issue_statuses(jira, keys, updated_since=None):
+    statuses = {}
+    for chunk in chunked(keys, JIRA_SEARCH_CHUNK_SIZE):
+        jql = "key in ({})".format(", ".join(f'"{key}"' for key in chunk))
+        if updated_since:
+            minutes = int((datetime.now().astimezone() - updated_since).total_seconds() // 60) + JIRA_POLL_OVERLAP_MINUTES
+            jql += f" AND updated >= -{minutes}m"
+
+        start_at = 0
+        while True:
+            issues = guarded(
+                "jira",
+                jira.search_issues,
+                jql,
+                startAt=start_at,
+                maxResults=JIRA_SEARCH_CHUNK_SIZE,
+                fields="status",
+                validate_query=False
+            )
+            for issue in issues:
+                statuses[issue.key] = issue.fields.status.name.lower()
+            start_at += len(issues)
+            if not issues or start_at >= issues.total:
+                break
+    return statuses
+
+
+@metrics.timed("process_jira_updates")
+def process_jira_updates():
+    jira = registry.get("jira")
+
+    ensure_migrated()
+    poll_started = datetime.now().astimezone()
+    with connection() as conn, conn.cursor() as cursor:
+        updated_since = get_sync_cursor(cursor, JIRA_POLL_CURSOR) if JIRA_POLL_UPDATED_ONLY else None
+        cursor.execute("""
+            SELECT id, email, jira_ticket, status, claim_data
+            FROM claims
+            WHERE status='submitted' AND jira_ticket IS NOT NULL
+        """)
+        claims = cursor.fetchall()
+
+    statuses = fetch_issue_statuses(jira, [claim[2] for claim in claims], updated_since)
+    print(f"Resolved {len(statuses)} Jira status(es) for {len(claims)} submitted claim(s).")
+
+    results = {}
+    status_updates = []
+    notifications = {}
+    for claim_id, email, jira_ticket, status, claim_data_json in claims:
+        issue_status = statuses.get(jira_ticket)
+        if not issue_status:
+            continue
+
+        if isinstance(claim_data_json, str):
+            claim_data = json.loads(claim_data_json)
+        else:
+            claim_data = claim_data_json or {}
+
+        if issue_status in ['approved', 'done', 'processed']:
+            subject = "Your Insurance Claim has been Processed"
+            body = f"""
+            Dear Customer,
+
+             Your insurance claim for policy {claim_data.get('policy_number')} has been processed successfully. 
+            The amount approved will reflect in your account within 24-48 hours.
+
+            Thank you for choosing StatusNeo Insurance.
+            """
+            new_status = 'processed'
+
+        elif issue_status in ['declined', 'rejected']:
+            subject = "Your Insurance Claim has been Declined"
+            body = f"""
+            Dear Customer,
+
+            We regret to inform you that your insurance claim for policy {claim_data.get('policy_number')} has been declined.
+
+            For more details, please contact our support team.
+
+            Thank you,
+            StatusNeo Insurance
+            """
+            new_status = 'declined'
+        else:
+            continue
+
+        notifications[claim_id] = new_mail(email, subject, body)
+        status_updates.append((claim_id, jira_ticket, new_status))
+        results[claim_id] = {
+            "email": email,
+            "status": new_status,
+            "jira_ticket": jira_ticket
+        }
+
+    with metrics.span("db_write"), connection() as conn, conn.cursor() as cursor:
+        updated = set()
+        if status_updates:
+            # Only claims still submitted under the polled ticket: another worker
+            # may have resubmitted the claim with a new ticket since the SELECT.
+            updated = {row[0] for row in execute_values(
+                cursor,
+                """
+                UPDATE claims SET status = v.status
+                FROM (VALUES %s) AS v(id, jira_ticket, status)
+                WHERE claims.id = v.id AND claims.jira_ticket = v.jira_ticket AND claims.status = 'submitted'
+                RETURNING claims.id
+                """,
+                status_updates,
+                fetch=True
+            )}
+        notifications = [mail for claim_id, mail in notifications.items() if claim_id in updated]
+        results = [result for claim_id, result in results.items() if claim_id in updated]
+        enqueue(cursor, notifications)
+        if JIRA_POLL_UPDATED_ONLY:
+            set_sync_cursor(cursor, JIRA_POLL_CURSOR, poll_started)
+        conn.commit()
+    if notifications:
+        wake_dispatcher()
+
+    return results
+
+
+def format_html_email(content: str, company_name: str = "AIG Team") -> str:
+    html_content = content.replace('\n', '<br>')
+    return f"""
+    <html>
+      <body style="font-family: Calibri, Arial, sans-serif; color: #222; line-height: 1.6; font-size: 15px; background-color:#f9f9f9; padding:20px;">
+        <div style="background-color:#fff; border:1px solid #ddd; border-radius:8px; padding:20px; max-width:600px; margin:auto;">
+          <p>{html_content}</p>
+          <br>
+          <p style="font-size: 13px; color: #555;">
+            Regards,<br><b>{company_name}</b>
+          </p>
+        </div>
+      </body>
+    </html>
+    """
+
+
+@metrics.timed("jira_create")
+def create_issue(jira_client, issue_dict):
+    # Not retried on a transient failure: the issue may have been created anyway.
+    return guarded("jira", jira_client.create_issue, fields=issue_dict, idempotent=False)
+
+
+def group_messages_by_sender(messages):
+    groups = {}
+    for index, msg in enumerate(messages):
+        email = msg.sender.address if msg.sender else None
+        if not email:
+            continue
+        groups.setdefault(email.lower(), []).append((index, msg))
+    return list(groups.values())
+
+
+MAILBOX_CURSOR = "mailbox_inbox"
+
+
+def get_sync_cursor(cursor, name):
+    cursor.execute("SELECT value FROM sync_state WHERE name=%s", (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def set_sync_cursor(cursor, name, value):
+    cursor.execute(
+        """
+        INSERT INTO sync_state (name, value) VALUES (%s, %s)
+        ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value
+        """,
+        (name, value)
+    )
+
+
+@metrics.timed("graph_fetch")
+def fetch_new_messages(inbox, cursor, high_water):
+    if high_water:
+        since = high_water - timedelta(minutes=MAIL_SYNC_OVERLAP_MINUTES)
+    else:
+        since = datetime.now().astimezone() - timedelta(minutes=MAIL_INITIAL_LOOKBACK_MINUTES)
+
+    # The overlap window lists the previous batch's messages again, so
+    # attachments are only downloaded for messages not seen before.
+    query = inbox.new_query().greater_equal('receivedDateTime', since)
+    messages = guarded("graph", lambda: list(inbox.get_messages(limit=None, batch=MAIL_PAGE_SIZE, query=query)))
+    if not messages:
+        return []
+
+    seen = seen_message_ids(cursor, [msg.object_id for msg in messages])
+    new_messages = [msg for msg in messages if msg.object_id not in seen]
+    for msg in new_messages:
+        if msg.has_attachments:
+            guarded("graph", msg.attachments.download_attachments)
+    print(f"Fetched {len(messages)} message(s) since {since}, {len(new_messages)} new.")
+    return new_messages
+
+
+def processed_message_ids(cursor, message_ids):
+    if not message_ids:
+        return set()
+    cursor.execute(
+        "SELECT message_id FROM processed_messages WHERE message_id = ANY(%s)",
+        (list(message_ids),)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def seen_message_ids(cursor, message_ids):
+    """Ids already queued as claim jobs or recorded in the processed-message ledger."""
+    if not message_ids:
+        return set()
+    cursor.execute(
+        """
+        SELECT message_id FROM claim_jobs WHERE message_id = ANY(%s)
+        UNION
+        SELECT message_id FROM processed_messages WHERE message_id = ANY(%s)
+        """,
+        (list(message_ids), list(message_ids))
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+@metrics.timed("graph_fetch")
+def fetch_message(mailbox, message_id):
+    return guarded("graph", mailbox.get_message, object_id=message_id, download_attachments=True)
+
+
+def enqueue_new_messages():
+    """Fetch new inbox mail and queue one claim job per message.
+
+    Only one node fetches at a time (transaction-scoped advisory lock); the
+    others go straight to leasing jobs. Jobs are durable, so the mailbox
+    cursor moves past everything fetched. Returns the fetched messages by id
+    so this node does not download them again for the jobs it leases.
+    """
+    inbox = registry.get("account").mailbox().inbox_folder()
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (MAILBOX_FETCH_LOCK_ID,))
+        if not cursor.fetchone()[0]:
+            conn.rollback()
+            print("Another worker is fetching the mailbox; only leasing queued jobs.")
+            return {}
+        high_water = get_sync_cursor(cursor, MAILBOX_CURSOR)
+        messages = fetch_new_messages(inbox, cursor, high_water)
+        queued = enqueue_jobs(cursor, messages)
+        record_outcomes(cursor, [
+            (msg.object_id, None, msg.received, "skipped_no_sender")
+            for msg in messages if not msg.sender or not msg.sender.address
+        ])
+        newest = max((msg.received for msg in messages), default=None)
+        if newest and (not high_water or newest > high_water):
+            set_sync_cursor(cursor, MAILBOX_CURSOR, newest)
+        conn.commit()
+    print(f"Queued {queued} new claim job(s).")
+    return {msg.object_id: msg for msg in messages}
+
+
+@metrics.timed("attachment_download")
+def collect_attachments(msg):
+    pdfs = []
+    non_pdf_files = []
+
+    if msg.has_attachments:
+        for att in msg.attachments:
+            filename = att.name
+
+            if not filename.lower().endswith('.pdf'):
+                non_pdf_files.append(filename)
+                continue
+
+            try:
+                file_bytes = att.content
+                if isinstance(file_bytes, str):
+                    file_bytes = base64.b64decode(file_bytes)
+
+                sha256, path, created = store_attachment(file_bytes)
+                pdfs.append({"filename": filename, "sha256": sha256, "data": file_bytes})
+                if created:
+                    print(f" Saved {filename} as {path}")
+                else:
+                    print(f" {filename} is already stored as {path}")
+
+            except Exception as e:
+                print(f" Failed to save {filename}: {e}")
+    else:
+        print("No attachments to fetch.")
+    return pdfs, non_pdf_files
+
+
+def prepare_attachments(cursor, messages, registered_emails):
+    prepared = {}
+    for index, msg in enumerate(messages):
+        if not msg.sender or msg.sender.address not in registered_emails:
+            continue
+        pdfs, non_pdf_files = collect_attachments(msg)
+        prepared[index] = ([] if non_pdf_files else pdfs, non_pdf_files)
+
+    pdfs = [pdf for attachments, _ in prepared.values() for pdf in attachments]
+    cached = lookup_cached(cursor, {pdf["sha256"] for pdf in pdfs})
+    to_extract = {pdf["sha256"]: pdf["data"] for pdf in pdfs if pdf["sha256"] not in cached}
+    with metrics.span("pdf_extract"):
+        texts = dict(zip(to_extract, extract_many(list(to_extract.values()))))
+    # Empty results are cached too, so a PDF without readable text is not re-extracted every run.
+    save_texts(cursor, texts)
+    print(f"{len(cached) + len(texts)} unique PDF(s): {len(cached)} cached, {len(texts)} extracted.")
+
+    classified = {}
+    for pdf in pdfs:
+        text, document_type, confidence = cached.get(pdf["sha256"], (texts.get(pdf["sha256"], ""), None, None))
+        del pdf["data"]
+        pdf["text"] = text
+        pdf["document_type"] = document_type
+        pdf["confidence"] = confidence
+        pdf["decided_by"] = DECIDED_BY_CACHE if document_type else None
+        if pdf["sha256"] in texts:
+            print(f"Extracted text from {pdf['filename']}:\n{text[:500]}")
+
+        if not document_type:
+            with metrics.span("classify"):
+                classification = classify_document(text)
+            pdf["confidence"] = classification.confidence
+            if classification.settled:
+                pdf["document_type"] = classification.document_type
+                pdf["decided_by"] = DECIDED_BY_RULES
+                classified[pdf["sha256"]] = (classification.document_type, DECIDED_BY_RULES, classification.confidence)
+            logger.info(
+                f"{pdf['filename']}: {pdf['document_type'] or 'ambiguous'} "
+                f"(confidence {classification.confidence}, decided by {pdf['decided_by'] or 'llm pending'})"
+            )
+    save_document_types(cursor, classified)
+    print(f"{len(classified)} PDF(s) classified by rules without the LLM.")
+    return prepared
+
+
+def find_registered_emails(cursor, messages):
+    addresses = list({msg.sender.address for msg in messages if msg.sender and msg.sender.address})
+    if not addresses:
+        return set()
+    cursor.execute("SELECT DISTINCT email FROM claims WHERE email = ANY(%s)", (addresses,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def load_job_messages(jobs, fetched):
+    """Return {job: message}; jobs whose message cannot be loaded get an outcome instead.
+
+    A fetch failure is an error, so the job is retried. A message that no
+    longer exists finishes its job: retrying cannot help, and a backed-off
+    job would hold up the sender's later messages.
+    """
+    mailbox = registry.get("account").mailbox()
+    messages = {}
+    outcomes = {}
+    for job in jobs:
+        try:
+            msg = fetched.get(job.message_id) or fetch_message(mailbox, job.message_id)
+        except Exception as e:
+            error = f"Could not fetch message: {e}"
+            outcomes[job] = ({"email": job.sender, "status": "error", "error": error}, error)
+            continue
+        if msg is None:
+            outcomes[job] = ({"email": job.sender, "status": "message_missing"}, None)
+        else:
+            messages[job] = msg
+    return messages, outcomes
+
+
+def process_claim_jobs(jobs, fetched, max_workers=None):
+    """Process a batch of leased jobs and return {job: (result, error)}."""
+    job_messages, outcomes = load_job_messages(jobs, fetched)
+
+    with connection() as conn, conn.cursor() as cursor:
+        # A previous attempt may have flushed its outcome and died before
+        # finishing the job; the ledger says the message is already handled.
+        processed = processed_message_ids(cursor, [msg.object_id for msg in job_messages.values()])
+        for job, msg in list(job_messages.items()):
+            if msg.object_id in processed:
+                outcomes[job] = ({"email": job.sender, "status": "already_processed"}, None)
+                del job_messages[job]
+
+        leased = list(job_messages)
+        messages = [job_messages[job] for job in leased]
+        registered_emails = find_registered_emails(cursor, messages)
+        prepared_attachments = prepare_attachments(cursor, messages, registered_emails)
+        conn.commit()
+
+    with metrics.span("rag_prepare"):
+        registry.get("policy_context").prepare(msg.body or "" for msg in messages)
+
+    results = {}
+    queued_mails = []
+
+    def process_sender(items):
+        with connection() as conn, conn.cursor() as cursor:
+            for index, msg in items:
+                email = msg.sender.address
+                writes = ClaimWriteBuffer(msg)
+                try:
+                    with metrics.message() as message_metrics:
+                        results[index] = process_claim_message(
+                            msg, email, conn, cursor, writes, prepared_attachments.get(index, ([], []))
+                        )
+                        with metrics.span("db_write"):
+                            queued_mails.append(writes.commit(conn, cursor, results[index]["status"]))
+                    results[index]["metrics"] = message_metrics
+                except Exception as e:
+                    logger.exception(f"Failed to process message from {email}: {e}")
+                    conn.rollback()
+                    results[index] = {"email": email, "status": "error", "error": str(e), "metrics": message_metrics}
+
+    with ThreadPoolExecutor(max_workers=max_workers or CLAIM_WORKERS) as executor:
+        list(executor.map(process_sender, group_messages_by_sender(messages)))
+    if any(queued_mails):
+        wake_dispatcher()
+
+    for index, job in enumerate(leased):
+        result = results[index]
+        outcomes[job] = (result, result["error"] if result["status"] == "error" else None)
+    return outcomes
+
+
+@metrics.timed("process_claims")
+def process_claims(max_workers=None):
+    ensure_migrated()
+    fetched = enqueue_new_messages()
+    queue = ClaimJobQueue()
+
+    batch_log = []
+    while True:
+        jobs = queue.lease(CLAIM_JOB_BATCH_SIZE)
+        if not jobs:
+            break
+        print(f"Leased {len(jobs)} claim job(s).")
+        try:
+            with queue.heartbeat([job.id for job in jobs]):
+                outcomes = process_claim_jobs(jobs, fetched, max_workers)
+        except Exception as e:
+            queue.finish({job: (None, str(e) or type(e).__name__) for job in jobs})
+            raise
+        queue.finish(outcomes)
+        batch_log.extend(outcomes[job][0] for job in jobs)
+
+    llm_calls_saved = sum(1 for entry in batch_log if entry.get("extracted_by") == DECIDED_BY_RULES)
+    logger.info(f"Claim extraction skipped the LLM for {llm_calls_saved} of {len(batch_log)} message(s)")
+    if registry.is_initialized("chat"):
+        logger.info(f"LLM cache stats: {registry.get('chat').cache.stats()}")
+    return batch_log
+
+
+def process_claim_message(msg, email, conn, cursor, writes, prepared):
+    chat = registry.get("chat")
+    jira = registry.get("jira")
+
+    email_body = msg.body or ""
+
+    cursor.execute("SELECT id FROM claims WHERE email=%s", (email,))
+    user_exists = cursor.fetchone()
+    if not user_exists:
+        print(f"Email {email} not found in database. Skipping.")
+        writes.enqueue_mail(new_mail(email, "Unable to Process Your Request", format_html_email("""
+        Dear Customer,
+
+        We noticed that your email ID is not registered with us. To access our insurance services and manage your policies, please sign up using your email ID.
+
+        We look forward to serving you and helping you protect what matters most.
+
+        Thank you,
+        """)))
+        return {"email": email, "status": "not_verfied_user"}
+
+    attachments, non_pdf_files = prepared
+    combined_pdf_text = "".join(att["text"] + "\n" for att in attachments)
+
+    if non_pdf_files:
+        prompt = f"""
+        Write a professional email (no subject, no greeting name) informing the customer:
+        The following attachments are not in PDF format: {placeholder('files')}.
+        Please resend all attachments in PDF format.
+         Strict Rules:
+        - Keep the placeholder {placeholder('files')} exactly as written.
+        - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
+        - DO NOT use any Markdown syntax.
+        - Write in plain professional text only, suitable for Outlook email body.
+        - Keep the tone formal, concise, and customer-friendly.
+        Company: StatusNeo Insurance.
+        """
+        response = chat.invoke(prompt, variables={"files": ", ".join(non_pdf_files)})
+        writes.enqueue_mail(reply_mail(msg, format_html_email(response.content)))
+        return {"email": email, "status": "rejected_non_pdf", "files": non_pdf_files}
+
+
+
+    identified = {
+        number: att["document_type"] for number, att in enumerate(attachments, start=1)
+        if att["document_type"]
+    }
+
+    def retrieve_policy_context():
+        with metrics.span("rag"):
+            return registry.get("policy_context").context_for(email_body)[0]
+
+    def prefill_fields():
+        with metrics.span("field_extract"):
+            return extract_fields(
+                email_body, [att["text"] for att in attachments], [att["document_type"] for att in attachments]
+            )
+
+    def extract(policy_context, prefilled):
+        if prefilled.complete and len(identified) == len(attachments):
+            print(f" All claim details read without the LLM: {prefilled.fields}")
+            extraction = ClaimExtraction(
+                policy_type=prefilled.policy_type, intent=prefilled.intent, fields=prefilled.fields
+            )
+            return extraction, DECIDED_BY_RULES
+        with metrics.span("extraction"):
+            extraction = extract_claim(
+                chat,
+                email_body,
+                policy_context,
+                fit_attachments([(att["filename"], att["text"]) for att in attachments], TOKEN_BUDGET_EXTRACTION),
+                identified,
+                prefilled.fields
+            )
+        return extraction, DECIDED_BY_LLM
+
+    # The extraction prompt includes the policy context, so only the rule
+    # based field extraction can overlap retrieval.
+    understanding = (
+        StepGraph()
+        .add("policy_context", retrieve_policy_context)
+        .add("prefilled", prefill_fields)
+        .add("extraction", extract, after=("policy_context", "prefilled"))
+    )
+    # An ExtractionError propagates: the message is then not marked processed,
+    # and the job is retried and finally dead-lettered instead of silently dropped.
+    steps = understanding.run()
+    policy_context = steps["policy_context"]
+    extraction, extracted_by = steps["extraction"]
+
+    llm_types = {doc.attachment: doc.document_type for doc in extraction.documents}
+    document_types = {}
+    for number, att in enumerate(attachments, start=1):
+        if number in identified:
+            continue
+        att["document_type"] = llm_types.get(number, UNRECOGNIZED_DOCUMENT)
+        att["decided_by"] = DECIDED_BY_LLM
+        # Only positive classifications are cached: the LLM also leaves out
+        # attachments it was not asked about (e.g. on queries), which must
+        # not stick as "other" forever.
+        if number in llm_types:
+            document_types[att["sha256"]] = (att["document_type"], DECIDED_BY_LLM, None)
+    writes.record_document_types(document_types)
+
+    document_report = [
+        {
+            "filename": att["filename"],
+            "document_type": att["document_type"],
+            "decided_by": att["decided_by"],
+            "confidence": att["confidence"],
+        }
+        for att in attachments
+    ]
+    for entry in document_report:
+        logger.info(f"{email}: {entry['filename']} -> {entry['document_type']} ({entry['decided_by']}, confidence {entry['confidence']})")
+
+    claim_data = extraction.claim_data()
+    document_data = {"provided_documents": sorted({
+        att["document_type"] for att in attachments if att["document_type"] != UNRECOGNIZED_DOCUMENT
+    })}
+    print(" Parsed Claim Data:", claim_data)
+    print(" Document Fields & Info:", document_data)
+
+    intent = extraction.intent
+    print(f" Detected intent: {intent}")
+
+    if intent == "query":
+        answers = registry.get("answer_cache")
+        rag = registry.get("policy_context")
+        question = rag.embed(email_body) if email_body.strip() else None
+        store_version = rag.store_version()
+        answer = answers.lookup(question, store_version) if question is not None else None
+        answer_cached = answer is not None
+
+        prompt_agent = f"""
+        you are a insurance agent who knows all policy plans.{policy_context}
+        start the mail with dear member,
+        and tell them whole about the policy plan and dont make it to long just give them short summary about plans.
+        that he or she wants to know about.
+        be very professional in your font.
+        Strict Rules:
+        - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
+        - DO NOT use any Markdown syntax.
+        - Write in plain professional text only, suitable for Outlook email body.
+        - Keep the tone formal, concise, and customer-friendly.
+        company name: AIG team.
+
+        """
+        if not answer_cached:
+            answer = chat.invoke(prompt_agent).content
+            if question is not None:
+                answers.add(question, answer, store_version)
+        writes.enqueue_mail(reply_mail(
+            msg, format_html_email(answer), subject="Information Regarding Your Insurance Query"
+        ))
+        return {
+            "email": email,
+            "status": "replied_query",
+            "answer_cached": answer_cached,
+            "documents": document_report,
+            "extracted_by": extracted_by
+        }
+
+    merged = merge_claim(cursor, email, claim_data, document_data.get("provided_documents", []))
+    # Release the claim row before the LLM and Jira calls below; re-applying
+    # the merge on a retry is a no-op.
+    conn.commit()
+    if merged:
+        claim_data_final, document_data_final = merged
+    else:
+        claim_data_final = claim_data or {}
+        document_data_final = document_data or {}
+
+    print(" Claim Fields & Info:")
+    print(json.dumps(claim_data_final, indent=2))
+
+    print(" Provided Documents:")
+    print(json.dumps(document_data_final, indent=2))
+
+
+    policy_type = claim_data_final.get("policy_type", "unknown")
+
+    policy_type = claim_data_final.get("policy_type")
+
+    if not policy_type or policy_type.lower() not in POLICY_REQUIREMENTS:
+        print(f" Unknown or missing policy type for {email}. Sending clarification email.")
+
+        clarification_body = """
+        <html>
+        <body style="font-family: Arial, sans-serif; color: #333; line-height: 1.6;">
+            <p>Dear Customer,</p>
+            <p>
+            We could not determine the type of your insurance policy or what kind of claim/query you are making
+             based on your recent email.
+            </p>
+            <p>
+            Please reply with your policy type or provide relevant documents so we can proceed with your claim.
+            </p>
+            <p>Thank you for choosing <b>AIG</b>.</p>
+            <br>
+            <p>Best regards,<br>
+            <b>AIG Team</b></p>
+        </body>
+        </html>
+        """
+        writes.enqueue_mail(new_mail(email, "Unable to Process Your query - Clarification Needed", clarification_body))
+
+        return {
+            "email": email,
+            "status": "unclear_messeage",
+            "documents": document_report,
+            "extracted_by": extracted_by
+        }
+
+    required_fields = get_required_fields(policy_type)
+    missing_fields = [f for f in required_fields if not claim_data_final.get(f)]
+
+    required_docs = get_required_documents(policy_type)
+    missing_docs = [d for d in required_docs if d not in document_data_final.get("provided_documents", [])]
+
+
+
+
+    if missing_docs or missing_fields:
+        prompt_missing = f"""
+        start the mail with dear member,
+        {policy_context} give a short description of the policy that user wants to claim.
+        Write a professional email (no subject, no greeting name) informing the customer:
+        The following required documents/fields are missing:
+        Documents: {missing_docs}
+        Fields: {missing_fields}
+        Company: AIG team
+        Strict Rules:
+        - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
+        - DO NOT use any Markdown syntax.
+        - Write in plain professional text only, suitable for Outlook email body.
+        - Keep the tone formal, concise, and customer-friendly.
+        """
+        response_missing = chat.invoke(prompt_missing)
+        writes.enqueue_mail(reply_mail(
+            msg,
+            format_html_email(response_missing.content),
+            subject="Additional Information Required for Your Insurance Claim"
+        ))
+
+        status = "pending" 
+
+        return {
+            "email": email,
+            "status": status,
+            "missing_documents": missing_docs,
+            "missing_fields": missing_fields,
+            "documents": document_report,
+            "extracted_by": extracted_by
+        }
+
+    else:
+        prompt_jira = f"""
+
+        {policy_context} give a short description of the policy that user wants to claim.
+        mailing to get the information about our policy plans and all just tell them about that.
+        The customer sent an email and attached PDF documents: #add attachments here
+        The extracted claim data is:
+
+        {json.dumps(claim_data_final, indent=2)}
+        {json.dumps(document_data_final, indent=2)}
+
+        {placeholder('attachment_summary')}
+        Provide a comprehensive, human-friendly Jira ticket description including:
+        1. Patient/incident history
+        2. Summarize each document and give each and every key values means give every possible information
+        also add the extract numbers and details mentioned in documents.
+        that you have got but in clean and precise way act like insurance claim head.
+        3. short AI assessment of claim eligibility and suggested claimable amount
+        4. what can be the next steps.
+        Make it clear and easy for a human to process.
+        Strict Rules:
+        - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
+        - DO NOT use any Markdown syntax.
+        - Write in plain professional text only, suitable for Outlook email body, use only bullets if needed.
+        - Keep the tone formal, concise, and customer-friendly.
+        - dont add date or time in jira description.
+        - all documents and summary is there that is needed to claim just human loop have to verify it write according to it.
+        - use from: Insurance Engine.
+        company name: AIG team.
+        """
+
+        prompt_mail = f"""
+        Write a professional email (no subject, no greeting name) informing the customer:
+        Their claim has been submitted successfully.
+        Reference Ticket ID: {placeholder('ticket_id')}.
+        Company: AIG team.
+        Strict Rules:
+        - Keep the placeholder {placeholder('ticket_id')} exactly as written.
+        - DO NOT use asterisks (*), backticks (`), hashtags (#), or bold/italic markers like **text** or *text*.
+        - DO NOT use any Markdown syntax.
+        - Write in plain professional text only, suitable for Outlook email body.
+        - Keep the tone formal, concise, and customer-friendly.
+        """
+
+        def summarize():
+            with metrics.span("summarize"):
+                return summarize_to_budget(chat, combined_pdf_text, TOKEN_BUDGET_JIRA)
+
+        async def describe(summary):
+            prompt = render_template(prompt_jira, {"attachment_summary": summary})
+            return (await chat.ainvoke(prompt)).content
+
+        async def write_confirmation():
+            # Drafted with the ticket placeholder left in, so it is ready by the
+            # time the issue exists. A failure falls back to the plain template.
+            try:
+                return (await chat.ainvoke(prompt_mail, variables={"ticket_id": placeholder("ticket_id")})).content
+            except Exception as e:
+                logger.warning(f"Could not draft the confirmation for {email}: {e}")
+                return None
+
+        def confirmation_mail(draft, ticket):
+            if draft and placeholder("ticket_id") in draft:
+                text = render_template(draft, {"ticket_id": ticket})
+            else:
+                # The draft failed or lost the ticket placeholder; another LLM call could do the same.
+                text = CONFIRMATION_FALLBACK.format(ticket_id=ticket)
+            return reply_mail(msg, format_html_email(text))
+
+        def open_issue(description, confirmation):
+            issue = create_issue(jira, {
+                'project': {'key': JIRA_PROJECT_KEY},
+                'summary': f"Insurance Claim - {claim_data_final.get('policy_number')}",
+                'description': description,
+                'issuetype': {'name': 'Task'}
+            })
+            # The ticket, its confirmation mail and the message outcome commit
+            # together, right after the issue exists.
+            record_ticket(cursor, email, msg.object_id, issue.key)
+            writes.enqueue_mail(confirmation_mail(confirmation, issue.key))
+            writes.commit(conn, cursor, "submitted")
+            return issue.key
+
+        # A retry after the issue was created only needs to send the confirmation.
+        ticket = submitted_ticket(cursor, email, msg.object_id)
+        submission = StepGraph().add("confirmation", write_confirmation)
+        if ticket is None:
+            ticket = (
+                submission
+                .add("summary", summarize)
+                .add("description", describe, after=("summary",))
+                .add("issue", open_issue, after=("description", "confirmation"))
+            ).run()["issue"]
+        else:
+            print(f" Jira ticket {ticket} was already opened for this message.")
+            writes.enqueue_mail(confirmation_mail(submission.run()["confirmation"], ticket))
+
+        return {
+            "email": email,
+            "status": "submitted",
+            "jira_ticket": ticket,
+            "documents": document_report,
+            "extracted_by": extracted_by
+        }
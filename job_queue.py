@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+from config import (
+    CLAIM_JOB_HEARTBEAT_SECONDS,
+    CLAIM_JOB_LEASE_SECONDS,
+    CLAIM_JOB_MAX_ATTEMPTS,
+    CLAIM_JOB_RETRY_BASE_SECONDS,
+    CLAIM_JOB_RETRY_MAX_SECONDS,
+)
+from db import connection, ensure_migrated
+from metrics import metrics
+from resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("pending", "running", "done", "dead")
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def retry_delay(attempts):
+    return backoff_delay(attempts, CLAIM_JOB_RETRY_BASE_SECONDS, CLAIM_JOB_RETRY_MAX_SECONDS)
+
+
+@dataclass(frozen=True)
+class ClaimJob:
+    id: int
+    message_id: str
+    sender: str
+    received_at: datetime
+    attempts: int
+
+
+def enqueue(cursor, messages):
+    """Queue one job per message; messages already queued are ignored."""
+    rows = [
+        (msg.object_id, msg.sender.address.lower(), msg.received)
+        for msg in messages if msg.sender and msg.sender.address
+    ]
+    if not rows:
+        return 0
+    inserted = execute_values(
+        cursor,
+        """
+        INSERT INTO claim_jobs (message_id, sender, received_at) VALUES %s
+        ON CONFLICT (message_id) DO NOTHING
+        RETURNING id
+        """,
+        rows,
+        fetch=True
+    )
+    return len(inserted)
+
+
+class ClaimJobQueue:
+    """Postgres-backed queue of claim messages shared by any number of workers.
+
+    Jobs are leased with FOR UPDATE SKIP LOCKED. A job is only leasable when
+    no earlier job from the same sender is still pending or running, so each
+    sender's mail is processed in order and never by two workers at once.
+    Leases are extended by a heartbeat while a batch runs; a lease that
+    expires (worker died) makes the job leasable again. Failed jobs are
+    retried with exponential backoff and moved to 'dead' after
+    CLAIM_JOB_MAX_ATTEMPTS attempts.
+    """
+
+    def __init__(self, lease_seconds=CLAIM_JOB_LEASE_SECONDS, heartbeat_seconds=CLAIM_JOB_HEARTBEAT_SECONDS,
+                 max_attempts=CLAIM_JOB_MAX_ATTEMPTS, owner=None):
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+        self.owner = owner or worker_id()
+
+    def lease(self, limit):
+        with connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE claim_jobs SET
+                    status = 'running',
+                    attempts = attempts + 1,
+                    locked_by = %s,
+                    locked_until = now() + make_interval(secs => %s),
+                    heartbeat_at = now()
+                WHERE id IN (
+                    SELECT job.id FROM claim_jobs job
+                    WHERE ((job.status = 'pending' AND job.next_attempt_at <= now())
+                           OR (job.status = 'running' AND job.locked_until < now()))
+                      AND NOT EXISTS (
+                          SELECT 1 FROM claim_jobs earlier
+                          WHERE earlier.sender = job.sender
+                            AND earlier.status IN ('pending', 'running')
+                            AND (earlier.received_at, earlier.id) < (job.received_at, job.id)
+                      )
+                    ORDER BY job.received_at, job.id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, message_id, sender, received_at, attempts
+                """,
+                (self.owner, self.lease_seconds, limit)
+            )
+            jobs = [ClaimJob(*row) for row in cursor.fetchall()]
+            conn.commit()
+        for job in jobs:
+            if job.attempts > 1:
+                metrics.incr("retries", stage="claim_job")
+        return sorted(jobs, key=lambda job: (job.received_at, job.id))
+
+    def extend(self, job_ids):
+        with connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE claim_jobs SET
+                    locked_until = now() + make_interval(secs => %s),
+                    heartbeat_at = now()
+                WHERE id = ANY(%s) AND locked_by = %s AND status = 'running'
+                """,
+                (self.lease_seconds, list(job_ids), self.owner)
+            )
+            conn.commit()
+
+    @contextmanager
+    def heartbeat(self, job_ids):
+        """Keep the leases on job_ids alive while the block runs."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.heartbeat_seconds):
+                try:
+                    self.extend(job_ids)
+                except Exception as e:
+                    logger.warning(f"Claim job heartbeat failed: {e}")
+
+        thread = threading.Thread(target=beat, name="claim-job-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def finish(self, outcomes):
+        """Record {job: (result, error)}; jobs with an error are retried or dead-lettered.
+
+        Only jobs still leased by this worker are updated, so a worker whose
+        lease expired cannot overwrite the outcome of the worker that took over.
+        """
+        done = [
+            (job.id, self.owner, json.dumps(result, default=str))
+            for job, (result, error) in outcomes.items() if error is None
+        ]
+        failed = [
+            (job.id, self.owner, error, "dead" if job.attempts >= self.max_attempts else "pending",
+             retry_delay(job.attempts))
+            for job, (result, error) in outcomes.items() if error is not None
+        ]
+        with connection() as conn, conn.cursor() as cursor:
+            if done:
+                execute_values(
+                    cursor,
+                    """
+                    UPDATE claim_jobs SET
+                        status = 'done', result = v.result, finished_at = now(),
+                        locked_by = NULL, locked_until = NULL, last_error = NULL
+                    FROM (VALUES %s) AS v(id, owner, result)
+                    WHERE claim_jobs.id = v.id AND claim_jobs.locked_by = v.owner AND claim_jobs.status = 'running'
+                    """,
+                    done,
+                    template="(%s, %s, %s::jsonb)"
+                )
+            if failed:
+                execute_values(
+                    cursor,
+                    """
+                    UPDATE claim_jobs SET
+                        status = v.status,
+                        last_error = v.error,
+                        locked_by = NULL,
+                        locked_until = NULL,
+                        next_attempt_at = now() + make_interval(secs => v.delay),
+                        finished_at = CASE WHEN v.status = 'dead' THEN now() END
+                    FROM (VALUES %s) AS v(id, owner, error, status, delay)
+                    WHERE claim_jobs.id = v.id AND claim_jobs.locked_by = v.owner AND claim_jobs.status = 'running'
+                    """,
+                    failed,
+                    template="(%s, %s, %s, %s, %s::double precision)"
+                )
+            conn.commit()
+
+        for job_id, _, error, status, delay in failed:
+            if status == "dead":
+                metrics.incr("dead_letters", stage="claim_job")
+                logger.error(f"Claim job {job_id} moved to dead letters: {error}")
+            else:
+                logger.warning(f"Claim job {job_id} failed, retrying in {delay:.0f}s: {error}")
+
+
+def queue_stats(cursor):
+    cursor.execute("SELECT status, count(*) FROM claim_jobs GROUP BY status")
+    counts = dict(cursor.fetchall())
+    return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+
+def requeue_dead(cursor, job_ids=None):
+    cursor.execute(
+        """
+        UPDATE claim_jobs SET status = 'pending', attempts = 0, next_attempt_at = now(), finished_at = NULL
+        WHERE status = 'dead' AND (%s::bigint[] IS NULL OR id = ANY(%s::bigint[]))
+        """,
+        (job_ids, job_ids)
+    )
+    return cursor.rowcount
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1:2]
+    if command not in (["stats"], ["requeue-dead"]):
+        print("usage: python job_queue.py stats | requeue-dead [job_id ...]")
+        sys.exit(1)
+    ensure_migrated()
+    with connection() as conn, conn.cursor() as cursor:
+        if command == ["stats"]:
+            print(queue_stats(cursor))
+        else:
+            ids = [int(job_id) for job_id in sys.argv[2:]] or None
+            print(f"Requeued {requeue_dead(cursor, ids)} dead job(s).")
+        conn.commit()
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import LLM_CACHE_DISK_ENTRIES, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_PATH, LLM_CACHE_TTL
+from metrics import metrics
+from resilience import aguarded, guarded
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+def placeholder(name: str) -> str:
+    return "{{" + name + "}}"
+
+
+def render_template(text: str, variables) -> str:
+    for name, value in (variables or {}).items():
+        text = text.replace(placeholder(name), str(value))
+    return text
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.split())
+
+
+def make_cache_key(prompt: str, params) -> str:
+    payload = json.dumps({"prompt": normalize_prompt(prompt), "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier (in-memory LRU + SQLite) cache of LLM completions with TTL."""
+
+    def __init__(
+        self,
+        path=LLM_CACHE_PATH,
+        max_memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+        max_disk_entries=LLM_CACHE_DISK_ENTRIES,
+        ttl=LLM_CACHE_TTL
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+        self._db.commit()
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                content, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return content
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT content, created_at FROM llm_cache WHERE key=?", (key,)
+            ).fetchone()
+            if row and not self._expired(row[1], now):
+                self._db.execute("UPDATE llm_cache SET last_access=? WHERE key=?", (now, key))
+                self._db.commit()
+                self._remember(key, row[0], row[1])
+                self._stats["disk_hits"] += 1
+                return row[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key, content):
+        now = time.time()
+        with self._lock:
+            self._remember(key, content, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, content, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+            self._evict_disk(now)
+            self._db.commit()
+
+    def discard(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, key, content, created_at):
+        self._memory[key] = (content, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self, now):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        deleted = self._db.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_disk_entries,)
+        ).rowcount
+        self._stats["evictions"] += max(deleted, 0)
+
+
+class CachedLLM:
+    """Wraps a chat model so invoke()/ainvoke() answer repeated prompts from LLMCache.
+
+    Prompts may contain placeholder("name") markers. The completion is cached
+    with the markers in place and the variables are substituted afterwards,
+    so e.g. every "claim submitted" mail shares one cached generation. A
+    completion that dropped a marker is returned as is and not cached; it is
+    not regenerated, so callers that need the value check for it themselves.
+    """
+
+    def __init__(self, llm, cache):
+        self.llm = llm
+        self.cache = cache
+
+    def model_params(self):
+        return {
+            "model": getattr(self.llm, "model", None),
+            "temperature": getattr(self.llm, "temperature", None),
+            "max_output_tokens": getattr(self.llm, "max_output_tokens", None),
+        }
+
+    def cache_key(self, prompt):
+        return make_cache_key(prompt, self.model_params())
+
+    def _record_usage(self, response):
+        metrics.incr("llm_calls")
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage:
+            metrics.incr("llm_tokens", usage.get("input_tokens", 0), direction="input")
+            metrics.incr("llm_tokens", usage.get("output_tokens", 0), direction="output")
+        return response.content
+
+    def generate(self, prompt):
+        with metrics.span("llm"):
+            response = guarded("llm", self.llm.invoke, prompt)
+        return self._record_usage(response)
+
+    async def agenerate(self, prompt):
+        with metrics.span("llm"):
+            response = await aguarded("llm", self.llm.ainvoke, prompt)
+        return self._record_usage(response)
+
+    def _cached(self, prompt, variables):
+        content = self.cache.get(self.cache_key(prompt))
+        if content is None:
+            return None
+        metrics.incr("llm_cache_hits")
+        return LLMResponse(render_template(content, variables))
+
+    def _cacheable(self, content, variables):
+        missing = [name for name in (variables or {}) if placeholder(name) not in content]
+        if missing:
+            logger.info(f"LLM output dropped placeholders {missing}; not caching it")
+        return not missing
+
+    def invoke(self, prompt, variables=None, use_cache=True):
+        if not use_cache:
+            return LLMResponse(self.generate(render_template(prompt, variables)))
+        cached = self._cached(prompt, variables)
+        if cached is not None:
+            return cached
+
+        content = self.generate(prompt)
+        if self._cacheable(content, variables):
+            self.cache.set(self.cache_key(prompt), content)
+        return LLMResponse(render_template(content, variables))
+
+    async def ainvoke(self, prompt, variables=None, use_cache=True):
+        """Async invoke(); cache reads and writes hit SQLite, so they run off the event loop."""
+        if not use_cache:
+            return LLMResponse(await self.agenerate(render_template(prompt, variables)))
+        cached = await asyncio.to_thread(self._cached, prompt, variables)
+        if cached is not None:
+            return cached
+
+        content = await self.agenerate(prompt)
+        if self._cacheable(content, variables):
+            await asyncio.to_thread(self.cache.set, self.cache_key(prompt), content)
+        return LLMResponse(render_template(content, variables))
+
+    def discard(self, prompt):
+        self.cache.discard(self.cache_key(prompt))
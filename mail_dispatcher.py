@@ -0,0 +1,191 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.extras import execute_values
+
+from config import (
+    MAIL_DISPATCH_BATCH_SIZE,
+    MAIL_DISPATCH_IN_PROCESS,
+    MAIL_DISPATCH_INTERVAL_SECONDS,
+    MAIL_DISPATCH_WORKERS,
+    MAIL_LEASE_SECONDS,
+    MAIL_MAX_ATTEMPTS,
+    MAIL_RETRY_BASE_SECONDS,
+    MAIL_RETRY_MAX_SECONDS,
+)
+from db import connection, ensure_migrated
+from metrics import metrics
+from outbox import OutgoingMail
+from resilience import backoff_delay, guarded
+from services import registry
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    return backoff_delay(attempts, MAIL_RETRY_BASE_SECONDS, MAIL_RETRY_MAX_SECONDS)
+
+
+def build_message(mailbox, mail):
+    if mail.reply_to_message_id:
+        original = guarded("graph", mailbox.get_message, object_id=mail.reply_to_message_id)
+        if original is None:
+            raise LookupError(f"Original message {mail.reply_to_message_id} not found")
+        # reply() creates a draft on the server, so it is not retried blindly either.
+        message = guarded("graph", original.reply, idempotent=False)
+    else:
+        message = mailbox.new_message()
+        message.to.add(mail.to_address)
+    if mail.subject:
+        message.subject = mail.subject
+    message.body = mail.body
+    message.body_type = mail.body_type
+    return message
+
+
+class MailDispatcher:
+    """Drains the outbox table with bounded parallelism.
+
+    Rows are leased with FOR UPDATE SKIP LOCKED, so several dispatchers can
+    run side by side; a lease that expires (dispatcher crashed mid-send) makes
+    the row due again. Failed sends are retried with exponential backoff and
+    marked failed after MAIL_MAX_ATTEMPTS. Delivery is at-least-once.
+    """
+
+    def __init__(self, workers=MAIL_DISPATCH_WORKERS, batch_size=MAIL_DISPATCH_BATCH_SIZE,
+                 interval=MAIL_DISPATCH_INTERVAL_SECONDS):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def lease(self):
+        with connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE outbox SET
+                    status = 'sending',
+                    attempts = attempts + 1,
+                    locked_until = now() + make_interval(secs => %s)
+                WHERE id IN (
+                    SELECT id FROM outbox
+                    WHERE (status = 'pending' AND next_attempt_at <= now())
+                       OR (status = 'sending' AND locked_until < now())
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, attempts, to_address, subject, body, reply_to_message_id, body_type
+                """,
+                (MAIL_LEASE_SECONDS, self.batch_size)
+            )
+            rows = cursor.fetchall()
+            conn.commit()
+        return sorted(rows)
+
+    def _send(self, mailbox, row):
+        outbox_id, attempts, *fields = row
+        if attempts > 1:
+            metrics.incr("retries", stage="mail_send")
+        try:
+            with metrics.span("mail_send"):
+                message = build_message(mailbox, OutgoingMail(*fields))
+                guarded("graph", message.send, idempotent=False)
+            return outbox_id, attempts, None
+        except Exception as e:
+            return outbox_id, attempts, str(e) or type(e).__name__
+
+    def dispatch_once(self):
+        rows = self.lease()
+        if not rows:
+            return 0
+        mailbox = registry.get("account").mailbox()
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(rows))) as executor:
+            outcomes = list(executor.map(lambda row: self._send(mailbox, row), rows))
+
+        sent = [(outbox_id,) for outbox_id, _, error in outcomes if error is None]
+        failed = [
+            (outbox_id, error, "failed" if attempts >= MAIL_MAX_ATTEMPTS else "pending", retry_delay(attempts))
+            for outbox_id, attempts, error in outcomes if error is not None
+        ]
+        with connection() as conn, conn.cursor() as cursor:
+            if sent:
+                execute_values(
+                    cursor,
+                    """
+                    UPDATE outbox SET status = 'sent', sent_at = now(), locked_until = NULL, last_error = NULL
+                    FROM (VALUES %s) AS v(id) WHERE outbox.id = v.id
+                    """,
+                    sent
+                )
+            if failed:
+                execute_values(
+                    cursor,
+                    """
+                    UPDATE outbox SET
+                        status = v.status,
+                        last_error = v.error,
+                        locked_until = NULL,
+                        next_attempt_at = now() + make_interval(secs => v.delay)
+                    FROM (VALUES %s) AS v(id, error, status, delay) WHERE outbox.id = v.id
+                    """,
+                    failed,
+                    template="(%s, %s, %s, %s::double precision)"
+                )
+            conn.commit()
+
+        for outbox_id, error, status, delay in failed:
+            if status == "failed":
+                logger.error(f"Giving up on outbox mail {outbox_id}: {error}")
+            else:
+                logger.warning(f"Outbox mail {outbox_id} failed, retrying in {delay:.0f}s: {error}")
+        logger.info(f"Dispatched {len(sent)} of {len(rows)} outbox mail(s)")
+        return len(rows)
+
+    def run(self):
+        ensure_migrated()
+        while not self._stop.is_set():
+            try:
+                while self.dispatch_once() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.exception(f"Mail dispatch failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="mail-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+@registry.register("mail_dispatcher")
+def _build_mail_dispatcher():
+    return MailDispatcher().start()
+
+
+def wake_dispatcher():
+    """Send newly committed outbox mail now instead of at the next poll.
+
+    With MAIL_DISPATCH_IN_PROCESS off, a separate `python mail_dispatcher.py`
+    process drains the outbox on its own interval.
+    """
+    if MAIL_DISPATCH_IN_PROCESS:
+        registry.get("mail_dispatcher").wake()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    MailDispatcher().run()
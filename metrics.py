@@ -0,0 +1,192 @@
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_SAMPLES
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_PREFIX = "policyiq"
+QUANTILES = (0.5, 0.95, 0.99)
+
+_message_counters = contextvars.ContextVar("message_counters", default=None)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def _format_labels(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+class Metrics:
+    """Stage timings and counters for the claim pipeline.
+
+    Everything is kept twice: cumulatively for the Prometheus endpoint, and
+    for the current batch (reset by start_batch) for the batch_runs table and
+    the dashboard. Counters incremented inside message() are also added to
+    that message's own counter dict.
+    """
+
+    def __init__(self, max_samples=METRICS_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._sums = defaultdict(float)
+        self._counts = defaultdict(int)
+        self._counters = defaultdict(float)
+        self._batch_samples = defaultdict(list)
+        self._batch_counters = defaultdict(float)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._sums[stage] += seconds
+            self._counts[stage] += 1
+            self._batch_samples[stage].append(seconds)
+
+    def incr(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+            self._batch_counters[key] += value
+            counters = _message_counters.get()
+            if counters is not None:
+                counters[name] = counters.get(name, 0) + value
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incr("errors", stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def message(self):
+        """Collect per-message counters (and total seconds) into the yielded dict."""
+        counters = {}
+        token = _message_counters.set(counters)
+        start = time.perf_counter()
+        try:
+            with self.span("message"):
+                yield counters
+        finally:
+            counters["seconds"] = round(time.perf_counter() - start, 3)
+            _message_counters.reset(token)
+
+    def bind(self, fn):
+        """Wrap fn so it counts towards the caller's message when run on another thread."""
+        counters = _message_counters.get()
+
+        def wrapper(*args, **kwargs):
+            token = _message_counters.set(counters)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _message_counters.reset(token)
+
+        return wrapper
+
+    def start_batch(self):
+        with self._lock:
+            self._batch_samples.clear()
+            self._batch_counters.clear()
+
+    def batch_snapshot(self):
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._batch_samples.items()}
+            counters = dict(self._batch_counters)
+        stages = [
+            {
+                "stage": stage,
+                "count": len(values),
+                "p50": round(percentile(values, 0.5), 3),
+                "p95": round(percentile(values, 0.95), 3),
+                "p99": round(percentile(values, 0.99), 3),
+                "max": round(max(values), 3),
+                "total": round(sum(values), 3),
+            }
+            for stage, values in sorted(samples.items())
+        ]
+        return {
+            "stages": stages,
+            "counters": {
+                f"{name}{{{_format_labels(labels)}}}" if labels else name: value
+                for (name, labels), value in sorted(counters.items())
+            },
+        }
+
+    def render_prometheus(self):
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+            sums = dict(self._sums)
+            counts = dict(self._counts)
+            counters = dict(self._counters)
+
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds summary",
+        ]
+        for stage in sorted(samples):
+            for q in QUANTILES:
+                lines.append(
+                    f'{PROMETHEUS_PREFIX}_stage_seconds{{stage="{stage}",quantile="{q}"}} '
+                    f"{percentile(samples[stage], q):.6f}"
+                )
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {sums[stage]:.6f}')
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_count{{stage="{stage}"}} {counts[stage]}')
+
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    suffix = f"{{{_format_labels(labels)}}}" if labels else ""
+                    lines.append(f"{PROMETHEUS_PREFIX}_{name}_total{suffix} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port):
+    server = ThreadingHTTPServer(("", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving Prometheus metrics on :{port}/metrics")
+    return server
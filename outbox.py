@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from psycopg2.extras import execute_values
+
+
+@dataclass
+class OutgoingMail:
+    to_address: Optional[str]
+    subject: Optional[str]
+    body: str
+    reply_to_message_id: Optional[str] = None
+    body_type: str = "HTML"
+
+
+def new_mail(to_address, subject, body, body_type="HTML"):
+    return OutgoingMail(to_address, subject, body, body_type=body_type)
+
+
+def reply_mail(msg, body, subject=None, body_type="HTML"):
+    """A reply to an inbox message; the dispatcher looks the message up again by its id."""
+    return OutgoingMail(
+        msg.sender.address if msg.sender else None,
+        subject,
+        body,
+        reply_to_message_id=msg.object_id,
+        body_type=body_type
+    )
+
+
+def enqueue(cursor, mails):
+    """Insert mails into the outbox; they are sent once the caller's transaction commits."""
+    if not mails:
+        return
+    execute_values(
+        cursor,
+        """
+        INSERT INTO outbox (to_address, reply_to_message_id, subject, body, body_type)
+        VALUES %s
+        """,
+        [(mail.to_address, mail.reply_to_message_id, mail.subject, mail.body, mail.body_type) for mail in mails]
+    )
@@ -0,0 +1,106 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz
+
+from config import OCR_DPI, PDF_TIME_BUDGET_SECONDS, PDF_WORKERS
+from services import registry
+
+logger = logging.getLogger(__name__)
+
+
+def ocr_page(page, timeout):
+    import pytesseract
+    from PIL import Image
+
+    pix = page.get_pixmap(dpi=OCR_DPI)
+    mode = "RGBA" if pix.alpha else "RGB"
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    return pytesseract.image_to_string(image, timeout=timeout)
+
+
+def extract_pdf_text(data: bytes, time_budget=PDF_TIME_BUDGET_SECONDS) -> str:
+    """Return the text of a PDF, OCR-ing only pages without a text layer.
+
+    OCR stops once time_budget seconds have been spent on the document;
+    remaining scanned pages are left empty, as are pages OCR fails on (a
+    timeout, or tesseract missing), so the text layer already read is kept.
+    """
+    deadline = time.monotonic() + time_budget
+    pages = []
+    skipped = 0
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for page in doc:
+            text = page.get_text()
+            if not text.strip():
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    try:
+                        text = ocr_page(page, timeout=remaining)
+                    except Exception as e:
+                        logger.warning(f"OCR failed on page {page.number + 1}: {type(e).__name__}: {e}")
+                        skipped += 1
+                else:
+                    skipped += 1
+            pages.append(text)
+    if skipped:
+        logger.warning(f"{skipped} scanned page(s) left without text")
+    return "".join(pages)
+
+
+def _extract_safely(data):
+    try:
+        return extract_pdf_text(data), None
+    except Exception as e:
+        return "", str(e)
+
+
+@registry.register("pdf_pool")
+def _build_pdf_pool():
+    # The pool is created lazily, when the worker already runs threads
+    # (heartbeat, dispatcher, event loop, metrics); forking that process is
+    # unsafe, so workers start from a clean interpreter instead.
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context(method))
+
+
+def _discard_pool(pool):
+    registry.reset("pdf_pool")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_many(documents):
+    """Extract the text of many PDFs (bytes) in parallel, preserving order.
+
+    If a worker process dies, the pool is broken for every pending document:
+    it is replaced for the next batch and the rest of this one is extracted
+    in-process.
+    """
+    if not documents:
+        return []
+    pool = registry.get("pdf_pool")
+    try:
+        futures = [pool.submit(_extract_safely, data) for data in documents]
+    except BrokenProcessPool:
+        # Broken since an earlier batch; a fresh pool takes this one.
+        _discard_pool(pool)
+        pool = registry.get("pdf_pool")
+        futures = [pool.submit(_extract_safely, data) for data in documents]
+    texts = []
+    broken = False
+    for data, future in zip(documents, futures):
+        try:
+            text, error = future.result()
+        except BrokenProcessPool as e:
+            if not broken:
+                broken = True
+                logger.error(f"PDF worker process died ({e}); rebuilding the pool, extracting in-process meanwhile")
+                _discard_pool(pool)
+            text, error = _extract_safely(data)
+        if error:
+            logger.error(f"PDF extraction failed: {error}")
+        texts.append(text)
+    return texts
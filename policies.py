@@ -0,0 +1,26 @@
+POLICY_REQUIREMENTS = {
+    "health": {
+        "documents": ["ssn_card", "doctor_bill", "doctor_receipt"],
+        "fields": ["patient_name", "policy_number", "date_of_birth", "treatment_date"]
+    },
+    "vehicle": {
+        "documents": ["driver_license", "vehicle_registration", "accident_report"],
+        "fields": ["owner_name", "policy_number", "vehicle_number", "accident_date"]
+    },
+    "life": {
+        "documents": ["ssn_card", "death_certificate", "medical_records"],
+        "fields": ["beneficiary_name", "policy_number", "date_of_birth", "death_date"]
+    }
+}
+
+DOCUMENT_TYPES = sorted({
+    doc for requirements in POLICY_REQUIREMENTS.values() for doc in requirements["documents"]
+})
+
+
+def get_required_documents(policy_type: str):
+    return POLICY_REQUIREMENTS.get(policy_type, {}).get("documents", [])
+
+
+def get_required_fields(policy_type: str):
+    return POLICY_REQUIREMENTS.get(policy_type, {}).get("fields", [])
@@ -0,0 +1,274 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from config import (
+    EMBEDDING_MODEL,
+    POLICY_CHUNK_OVERLAP,
+    POLICY_CHUNK_SIZE,
+    POLICY_DOCS_DIR,
+    POLICY_INDEX_DIR,
+    POLICY_VECTOR_DB,
+)
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.json"
+MANIFEST_FILE = "manifest.json"
+POLICY_EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def index_version(model, documents):
+    """Identify the index contents: changes whenever a document or the model changes."""
+    payload = json.dumps({"model": model, "documents": documents}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _write_atomic(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FaissPolicyStore(VectorStore):
+    """Read-only policy vector store over a memory-mapped matrix of normalized embeddings.
+
+    The vectors file is opened with mmap, so loading costs a header read and
+    pages are faulted in by the OS as queries touch them. Search is exact
+    inner product (cosine, since rows are normalized) via faiss.knn, which
+    works on the mapped array without copying it into an index. Build and
+    update the files with `python policy_index.py ingest`.
+    """
+
+    def __init__(self, vectors, chunks, manifest, embedding_function=None):
+        self.vectors = vectors
+        self.chunks = chunks
+        self.manifest = manifest
+        self.embedding_function = embedding_function
+
+    @classmethod
+    def load(cls, index_dir=POLICY_INDEX_DIR, embedding_function=None):
+        with open(os.path.join(index_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        with open(os.path.join(index_dir, CHUNKS_FILE), encoding="utf-8") as f:
+            chunks = json.load(f)
+        vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode="r")
+        if len(vectors) != len(chunks):
+            raise ValueError(f"{index_dir} is inconsistent: {len(vectors)} vectors for {len(chunks)} chunks")
+        if manifest.get("model") != EMBEDDING_MODEL:
+            logger.warning(f"Policy index was built with {manifest.get('model')}, configured model is {EMBEDDING_MODEL}")
+        logger.info(f"Loaded policy index {manifest['version']} with {len(chunks)} chunk(s)")
+        return cls(vectors, chunks, manifest, embedding_function)
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        count = min(k, len(self.chunks))
+        if count == 0:
+            return []
+        query = normalize_rows([embedding])
+        if query.shape[1] != self.vectors.shape[1]:
+            raise ValueError(f"Query has dimension {query.shape[1]}, index has {self.vectors.shape[1]}")
+        scores, rows = faiss.knn(query, self.vectors, count, metric=faiss.METRIC_INNER_PRODUCT)
+        return [
+            (Document(page_content=self.chunks[row]["text"], metadata=self.chunks[row]["metadata"]), float(score))
+            for score, row in zip(scores[0], rows[0]) if row >= 0
+        ]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embedding_function.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("The policy index is read-only; run `python policy_index.py ingest` to update it")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Build the policy index with `python policy_index.py ingest`")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_documents(docs_dir):
+    """Return {relative path: sha256} for every policy document under docs_dir."""
+    documents = {}
+    for root, _, files in os.walk(docs_dir):
+        for name in sorted(files):
+            if name.lower().endswith(POLICY_EXTENSIONS):
+                path = os.path.join(root, name)
+                documents[os.path.relpath(path, docs_dir)] = file_hash(path)
+    return documents
+
+
+def read_document(path):
+    if path.lower().endswith(".pdf"):
+        from pdf_extract import extract_pdf_text
+
+        with open(path, "rb") as f:
+            return extract_pdf_text(f.read())
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def split_document(text, source, sha256):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=POLICY_CHUNK_SIZE, chunk_overlap=POLICY_CHUNK_OVERLAP)
+    return [
+        {"text": chunk, "metadata": {"source": source, "sha256": sha256, "chunk": number}}
+        for number, chunk in enumerate(splitter.split_text(text))
+    ]
+
+
+def load_existing(index_dir):
+    try:
+        store = FaissPolicyStore.load(index_dir)
+    except FileNotFoundError:
+        return None
+    if store.manifest.get("model") != EMBEDDING_MODEL:
+        logger.info("Embedding model changed; re-embedding every policy document")
+        return None
+    return store
+
+
+def ingest(docs_dir=POLICY_DOCS_DIR, index_dir=POLICY_INDEX_DIR, embedding_model=None, force=False):
+    """Bring the index in index_dir up to date with docs_dir.
+
+    Only documents whose content hash is new or changed are read, split and
+    embedded; chunks of unchanged documents keep their stored vectors, and
+    chunks of deleted documents are dropped.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    current = scan_documents(docs_dir)
+    existing = None if force else load_existing(index_dir)
+    known = existing.manifest["documents"] if existing else {}
+
+    kept_rows = [
+        row for row, chunk in enumerate(existing.chunks if existing else [])
+        if known.get(chunk["metadata"]["source"]) == current.get(chunk["metadata"]["source"])
+    ]
+    changed = sorted(source for source, sha256 in current.items() if known.get(source) != sha256)
+    removed = sorted(set(known) - set(current))
+
+    new_chunks = []
+    for source in changed:
+        text = read_document(os.path.join(docs_dir, source))
+        if not text.strip():
+            logger.warning(f"{source} has no extractable text; skipping")
+            continue
+        new_chunks.extend(split_document(text, source, current[source]))
+
+    if new_chunks:
+        if embedding_model is None:
+            from services import registry
+
+            embedding_model = registry.get("embedding_model")
+        new_vectors = normalize_rows(embedding_model.embed_documents([chunk["text"] for chunk in new_chunks]))
+    else:
+        new_vectors = None
+
+    parts = [np.asarray(existing.vectors[kept_rows], dtype=np.float32)] if existing and kept_rows else []
+    if new_vectors is not None:
+        parts.append(new_vectors)
+    if parts:
+        vectors = np.concatenate(parts)
+    else:
+        dimension = existing.vectors.shape[1] if existing else 0
+        vectors = np.zeros((0, dimension), dtype=np.float32)
+    chunks = [existing.chunks[row] for row in kept_rows] + new_chunks if existing else new_chunks
+
+    manifest = {"model": EMBEDDING_MODEL, "dimension": int(vectors.shape[1]), "documents": current}
+    manifest["version"] = index_version(EMBEDDING_MODEL, current)
+
+    _write_atomic(os.path.join(index_dir, VECTORS_FILE), lambda f: np.save(f, vectors))
+    _write_atomic(os.path.join(index_dir, CHUNKS_FILE), lambda f: f.write(json.dumps(chunks).encode("utf-8")))
+    _write_atomic(os.path.join(index_dir, MANIFEST_FILE), lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")))
+
+    logger.info(
+        f"Policy index {manifest['version']}: {len(changed)} document(s) embedded ({len(new_chunks)} chunk(s)), "
+        f"{len(current) - len(changed)} unchanged, {len(removed)} removed, {len(chunks)} chunk(s) total"
+    )
+    return {"embedded": changed, "removed": removed, "chunks": len(chunks), "version": manifest["version"]}
+
+
+def mark_chroma(docs_dir=POLICY_DOCS_DIR, db_dir=POLICY_VECTOR_DB):
+    """Write a manifest with the version of the documents the Chroma store in db_dir was built from.
+
+    Chroma is populated outside this module; run this after (re)building it
+    so workers see the new version, as they do with the FAISS manifest.
+    """
+    manifest = {"model": EMBEDDING_MODEL, "version": index_version(EMBEDDING_MODEL, scan_documents(docs_dir))}
+    os.makedirs(db_dir, exist_ok=True)
+    _write_atomic(os.path.join(db_dir, MANIFEST_FILE), lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")))
+    return manifest["version"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the FAISS policy index and the Chroma store's version.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subparsers.add_parser("ingest", help="embed new or changed policy documents")
+    ingest_parser.add_argument("--docs", default=POLICY_DOCS_DIR, help="directory of policy documents")
+    ingest_parser.add_argument("--index", default=POLICY_INDEX_DIR, help="index directory")
+    ingest_parser.add_argument("--force", action="store_true", help="re-embed every document")
+    mark_parser = subparsers.add_parser("mark-chroma", help="record the version of a rebuilt Chroma store")
+    mark_parser.add_argument("--docs", default=POLICY_DOCS_DIR, help="directory of policy documents")
+    mark_parser.add_argument("--db", default=POLICY_VECTOR_DB, help="Chroma persist directory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not os.path.isdir(args.docs):
+        print(f"Policy document directory {args.docs} does not exist.")
+        return 1
+    if args.command == "mark-chroma":
+        print(f"Chroma store in {args.db} marked as version {mark_chroma(args.docs, args.db)}.")
+        return 0
+    summary = ingest(args.docs, args.index, force=args.force)
+    print(f"Policy index {summary['version']} has {summary['chunks']} chunk(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
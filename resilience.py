@@ -0,0 +1,304 @@
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from config import (
+    BACKEND_RETRY_ATTEMPTS,
+    BACKEND_RETRY_BASE_SECONDS,
+    BACKEND_RETRY_MAX_SECONDS,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+    GRAPH_RATE_BURST,
+    GRAPH_RATE_PER_SECOND,
+    JIRA_RATE_BURST,
+    JIRA_RATE_PER_SECOND,
+    LLM_RATE_BURST,
+    LLM_RATE_PER_SECOND,
+)
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionError, TimeoutError)
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+THROTTLED_STATUSES = {429}
+
+BACKEND_LIMITS = {
+    "llm": (LLM_RATE_PER_SECOND, LLM_RATE_BURST),
+    "jira": (JIRA_RATE_PER_SECOND, JIRA_RATE_BURST),
+    "graph": (GRAPH_RATE_PER_SECOND, GRAPH_RATE_BURST),
+}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def backoff_delay(attempt, base, cap):
+    """Exponential backoff with equal jitter: half of the delay is fixed, half random."""
+    delay = min(cap, base * 2 ** max(attempt - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def status_code(error):
+    response = getattr(error, "response", None)
+    for value in (getattr(error, "status_code", None), getattr(response, "status_code", None),
+                  getattr(error, "code", None)):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def retry_after(error):
+    """Seconds from a Retry-After header on the error's response, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(when.tzinfo)).total_seconds(), 0.0)
+
+
+def is_transient(error):
+    return isinstance(error, TRANSIENT_ERRORS) or status_code(error) in TRANSIENT_STATUSES
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate adapts to throttling.
+
+    The rate is halved whenever the backend throttles and grows back by 5% of
+    the configured rate per successful call. pause() empties the bucket so
+    every thread waits out a Retry-After, not just the one that got it.
+    A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self):
+        """Take a token and return 0, or return how long to wait for one."""
+        if not self.max_rate:
+            return 0
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        while wait := self._take():
+            time.sleep(wait)
+
+    async def aacquire(self):
+        while wait := self._take():
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        if not self.max_rate:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+    def throttled(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.max_rate / 10, self.rate / 2)
+
+    def succeeded(self):
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive transient failures.
+
+    While open, calls fail fast with CircuitOpenError. After `reset_seconds`
+    a single trial call is let through: success closes the circuit, failure
+    opens it again.
+    """
+
+    def __init__(self, name, threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"{self.name} circuit closed")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                metrics.incr("circuit_opened", backend=self.name)
+                logger.warning(f"{self.name} circuit opened after {self.failures} failure(s)")
+
+    @property
+    def is_open(self):
+        return self.state == "open"
+
+
+class Backend:
+    """Rate limit, retry and circuit breaker for one external service, shared by all threads."""
+
+    def __init__(self, name, rate, burst, max_attempts=BACKEND_RETRY_ATTEMPTS, base_delay=BACKEND_RETRY_BASE_SECONDS,
+                 max_delay=BACKEND_RETRY_MAX_SECONDS, breaker=None):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker(name)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            metrics.incr("circuit_rejections", backend=self.name)
+            raise CircuitOpenError(f"{self.name} circuit is open; not calling it")
+
+    def _succeeded(self):
+        self.breaker.record_success()
+        self.bucket.succeeded()
+
+    def _retry_wait(self, error, attempt, idempotent):
+        """Record a failed call and return seconds to wait before retrying, or None to give up."""
+        throttled = status_code(error) in THROTTLED_STATUSES
+        if throttled:
+            self.bucket.throttled()
+            self.breaker.record_success()
+            metrics.incr("throttled", backend=self.name)
+        elif is_transient(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            return None
+
+        wait = retry_after(error)
+        if (attempt == self.max_attempts or self.breaker.is_open or (not idempotent and not throttled)
+                or (wait is not None and wait > self.max_delay)):
+            return None
+        if wait is None:
+            wait = backoff_delay(attempt, self.base_delay, self.max_delay)
+        else:
+            self.bucket.pause(wait)
+        logger.warning(
+            f"{self.name} call failed (attempt {attempt}/{self.max_attempts}), retrying in {wait:.1f}s: {error}"
+        )
+        metrics.incr("retries", stage=self.name)
+        return wait
+
+    def call(self, fn, *args, idempotent=True, **kwargs):
+        """Call fn(*args, **kwargs), retrying transient failures.
+
+        Non-idempotent calls (e.g. sending mail) are only retried when the
+        backend throttled them, since the request was then not carried out.
+        A Retry-After longer than max_delay is not waited out in-process;
+        the error is raised so the job or outbox retry picks it up later.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            self._check_circuit()
+            self.bucket.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                wait = self._retry_wait(e, attempt, idempotent)
+                if wait is None:
+                    raise
+                time.sleep(wait)
+            else:
+                self._succeeded()
+                return result
+
+    async def acall(self, fn, *args, idempotent=True, **kwargs):
+        """Async call(): awaits fn(*args, **kwargs) and sleeps without blocking the event loop."""
+        for attempt in range(1, self.max_attempts + 1):
+            self._check_circuit()
+            await self.bucket.aacquire()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                wait = self._retry_wait(e, attempt, idempotent)
+                if wait is None:
+                    raise
+                await asyncio.sleep(wait)
+            else:
+                self._succeeded()
+                return result
+
+    def snapshot(self):
+        return {"rate": round(self.bucket.rate, 3), "circuit": self.breaker.state, "failures": self.breaker.failures}
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def backend(name):
+    if name not in _backends:
+        with _backends_lock:
+            if name not in _backends:
+                rate, burst = BACKEND_LIMITS[name]
+                _backends[name] = Backend(name, rate, burst)
+    return _backends[name]
+
+
+def guarded(name, fn, *args, idempotent=True, **kwargs):
+    """Call fn through the shared Backend for `name` ("llm", "jira" or "graph")."""
+    return backend(name).call(fn, *args, idempotent=idempotent, **kwargs)
+
+
+async def aguarded(name, fn, *args, idempotent=True, **kwargs):
+    """Await fn through the shared Backend for `name`."""
+    return await backend(name).acall(fn, *args, idempotent=idempotent, **kwargs)
+
+
+def snapshot():
+    return {name: instance.snapshot() for name, instance in _backends.items()}
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from config import (
+    POLICY_INDEX_DIR,
+    POLICY_VECTOR_DB,
+    RAG_CACHE_MAX_ENTRIES,
+    RAG_CACHE_THRESHOLD,
+    RAG_MODE,
+    RAG_TOP_K,
+    VECTOR_BACKEND,
+)
+from resilience import guarded
+from services import registry
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class RetrievalCache:
+    """Reuses retrieved chunks for queries whose embeddings are near-duplicates."""
+
+    def __init__(self, threshold=RAG_CACHE_THRESHOLD, max_entries=RAG_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors = []
+        self._documents = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, vector):
+        vector = normalize(vector)
+        with self._lock:
+            if self._vectors:
+                scores = np.stack(self._vectors) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    return self._documents[best]
+            self.misses += 1
+            return None
+
+    def add(self, vector, documents):
+        with self._lock:
+            self._vectors.append(normalize(vector))
+            self._documents.append(documents)
+            if len(self._vectors) > self.max_entries:
+                del self._vectors[0]
+                del self._documents[0]
+
+    def clear(self):
+        with self._lock:
+            self._vectors.clear()
+            self._documents.clear()
+
+
+_UNSEEN = object()
+
+
+class PolicyContextProvider:
+    """Turns an email body into the policy_context pasted into claim prompts.
+
+    mode="summarize" runs the shared RetrievalQA "stuff" chain over the
+    retrieved chunks, like the original per-message chain did.
+    mode="raw" passes the retrieved chunks through without the extra LLM call.
+    """
+
+    def __init__(self, mode=RAG_MODE, k=RAG_TOP_K, cache=None):
+        if mode not in ("summarize", "raw"):
+            raise ValueError(f"Unknown RAG mode: {mode}")
+        self.mode = mode
+        self.k = k
+        self.cache = cache or RetrievalCache()
+        self._vectors = {}
+        self._manifest = (None, None)
+        self._version = _UNSEEN
+        self._version_lock = threading.Lock()
+
+    def prepare(self, texts):
+        texts = list(dict.fromkeys(text for text in texts if text))
+        if not texts:
+            self._vectors = {}
+            return
+        vectors = registry.get("embedding_model").embed_documents(texts)
+        self._vectors = dict(zip(texts, vectors))
+        logger.info(f"Embedded {len(texts)} email bodies in one batch")
+
+    def embed(self, text):
+        vector = self._vectors.get(text)
+        if vector is None:
+            vector = registry.get("embedding_model").embed_query(text)
+        return vector
+
+    def store_version(self):
+        """Version of the policy store on disk, so a rebuild by another process is noticed.
+
+        The version comes from manifest.json in the FAISS index directory or,
+        for Chroma, in the persist directory (written by `policy_index.py
+        mark-chroma`); it is re-read whenever the file changes, and is None
+        without a manifest. When it changes, cached retrievals are dropped
+        and the vector store is loaded again.
+        """
+        from policy_index import MANIFEST_FILE
+
+        store_dir = POLICY_INDEX_DIR if VECTOR_BACKEND == "faiss" else POLICY_VECTOR_DB
+        with self._version_lock:
+            version = self._manifest_version(os.path.join(store_dir, MANIFEST_FILE))
+            if version != self._version:
+                if self._version is not _UNSEEN:
+                    logger.info(f"Policy store changed to version {version}; reloading it")
+                    self.cache.clear()
+                    registry.reset("vectorstore", "retriever", "qa_chain")
+                self._version = version
+        return version
+
+    def _manifest_version(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if self._manifest[0] != mtime:
+            with open(path, encoding="utf-8") as f:
+                self._manifest = (mtime, json.load(f)["version"])
+        return self._manifest[1]
+
+    def retrieve(self, text):
+        self.store_version()
+        vector = self.embed(text)
+        documents = self.cache.lookup(vector)
+        if documents is None:
+            documents = registry.get("vectorstore").similarity_search_by_vector(vector, k=self.k)
+            self.cache.add(vector, documents)
+        return documents
+
+    def context_for(self, text):
+        documents = self.retrieve(text)
+        if self.mode == "raw":
+            return "\n\n".join(doc.page_content for doc in documents), documents
+
+        qa_chain = registry.get("qa_chain")
+        result = guarded(
+            "llm", qa_chain.combine_documents_chain.invoke, {"input_documents": documents, "question": text}
+        )
+        return result["output_text"], documents
@@ -0,0 +1,232 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from config import (
+    CLIENT_ID,
+    CLIENT_SECRET,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    GOOGLE_API_KEY,
+    JIRA_SERVER,
+    JIRA_TOKEN,
+    JIRA_USER,
+    LLM_MODEL,
+    POLICY_INDEX_DIR,
+    POLICY_VECTOR_DB,
+    REDIRECT_URI,
+    RAG_TOP_K,
+    SCOPES,
+    VECTOR_BACKEND,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Process-wide container that builds each external client on first use."""
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._init_times = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory=None):
+        if factory is None:
+            def decorator(fn):
+                self.register(name, fn)
+                return fn
+            return decorator
+
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+        return factory
+
+    def get(self, name):
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self._factories:
+            raise KeyError(f"Unknown service: {name}")
+
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                elapsed = time.perf_counter() - start
+                self._init_times[name] = elapsed
+                self._instances[name] = instance
+                logger.info(f"Initialized service '{name}' in {elapsed:.2f}s")
+        return self._instances[name]
+
+    @contextmanager
+    def override(self, name, instance):
+        """Temporarily serve instance for name, e.g. a fake backend in benchmarks."""
+        missing = object()
+        with self._lock:
+            previous = self._instances.get(name, missing)
+            self._instances[name] = instance
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                if previous is missing:
+                    self._instances.pop(name, None)
+                else:
+                    self._instances[name] = previous
+
+    def reset(self, *names):
+        """Drop built instances so the next get() builds them again, e.g. after the policy store was rebuilt."""
+        with self._lock:
+            for name in names:
+                self._instances.pop(name, None)
+
+    def is_initialized(self, name):
+        return name in self._instances
+
+    def init_times(self):
+        return dict(self._init_times)
+
+    def prewarm(self, names=None, background=True):
+        names = list(names or self._factories)
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.exception(f"Failed to pre-warm service '{name}': {e}")
+
+        if not background:
+            run()
+            return None
+
+        thread = threading.Thread(target=run, name="service-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+
+registry = ServiceRegistry()
+
+
+@registry.register("account")
+def _build_account():
+    from O365 import Account
+
+    account = Account((CLIENT_ID, CLIENT_SECRET))
+    if not account.is_authenticated:
+        account.authenticate(scopes=SCOPES, redirect_uri=REDIRECT_URI)
+    return account
+
+
+@registry.register("o365_tools")
+def _build_o365_tools():
+    from langchain_community.agent_toolkits.office365.toolkit import O365Toolkit
+    from langchain_community.tools.office365.create_draft_message import O365CreateDraftMessage
+    from langchain_community.tools.office365.events_search import O365SearchEvents
+    from langchain_community.tools.office365.messages_search import O365SearchEmails
+    from langchain_community.tools.office365.send_event import O365SendEvent
+    from langchain_community.tools.office365.send_message import O365SendMessage
+
+    O365CreateDraftMessage.model_rebuild()
+    O365SearchEvents.model_rebuild()
+    O365SearchEmails.model_rebuild()
+    O365SendEvent.model_rebuild()
+    O365SendMessage.model_rebuild()
+    toolkit = O365Toolkit(account=registry.get("account"))
+    return toolkit.get_tools()
+
+
+@registry.register("llm")
+def _build_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        google_api_key=GOOGLE_API_KEY,
+        model=LLM_MODEL,
+        temperature=0,
+        max_output_tokens=2048,
+        timeout=60,
+        # Retries and backoff happen in resilience.guarded("llm", ...).
+        max_retries=1
+    )
+
+
+@registry.register("chat")
+def _build_chat():
+    from llm_cache import CachedLLM, LLMCache
+
+    return CachedLLM(registry.get("llm"), LLMCache())
+
+
+@registry.register("jira")
+def _build_jira():
+    from jira import JIRA
+
+    jira_options = {"server": JIRA_SERVER}
+    return JIRA(options=jira_options, basic_auth=(JIRA_USER, JIRA_TOKEN), timeout=30)
+
+
+@registry.register("embedding_model")
+def _build_embedding_model():
+    if EMBEDDING_BACKEND == "quantized":
+        from embeddings import QuantizedEmbeddings
+
+        return QuantizedEmbeddings()
+    if EMBEDDING_BACKEND != "huggingface":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+@registry.register("vectorstore")
+def _build_vectorstore():
+    if VECTOR_BACKEND == "faiss":
+        from policy_index import FaissPolicyStore
+
+        return FaissPolicyStore.load(POLICY_INDEX_DIR, embedding_function=registry.get("embedding_model"))
+    if VECTOR_BACKEND != "chroma":
+        raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}")
+
+    from langchain_chroma import Chroma
+
+    return Chroma(
+        persist_directory=POLICY_VECTOR_DB,
+        embedding_function=registry.get("embedding_model")
+    )
+
+
+@registry.register("retriever")
+def _build_retriever():
+    return registry.get("vectorstore").as_retriever(search_kwargs={"k": RAG_TOP_K})
+
+
+@registry.register("qa_chain")
+def _build_qa_chain():
+    from langchain.chains import RetrievalQA
+
+    return RetrievalQA.from_chain_type(
+        llm=registry.get("llm"),
+        chain_type="stuff",
+        retriever=registry.get("retriever"),
+        return_source_documents=True
+    )
+
+
+@registry.register("answer_cache")
+def _build_answer_cache():
+    from answer_cache import AnswerCache
+
+    return AnswerCache()
+
+
+@registry.register("policy_context")
+def _build_policy_context():
+    from retrieval import PolicyContextProvider
+
+    return PolicyContextProvider()
@@ -0,0 +1,90 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def event_loop():
+    """The process-wide event loop, running in a daemon thread.
+
+    Claim workers are threads; they all submit to this one loop so async LLM
+    clients stay bound to a single loop for the life of the process.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="step-graph-loop", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run(coro):
+    """Run coro on the shared loop and block until it finishes.
+
+    The caller's contextvars (e.g. the per-message metrics counters) are
+    carried into the task.
+    """
+    loop = event_loop()
+    context = contextvars.copy_context()
+    result = concurrent.futures.Future()
+
+    def done(task):
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start():
+        context.run(loop.create_task, coro).add_done_callback(done)
+
+    loop.call_soon_threadsafe(start)
+    return result.result()
+
+
+class StepGraph:
+    """Named steps with dependencies; each step starts as soon as its dependencies are done.
+
+    A step is called with its dependencies' results as keyword arguments.
+    Coroutine functions are awaited on the loop; plain functions run in a
+    thread so blocking calls (the Jira client, embedding) do not stall the
+    other steps.
+    """
+
+    def __init__(self):
+        self._steps = {}
+
+    def add(self, name, fn, after=()):
+        unknown = [dep for dep in after if dep not in self._steps]
+        if unknown:
+            raise ValueError(f"Step {name!r} depends on unknown step(s) {unknown}")
+        self._steps[name] = (fn, tuple(after))
+        return self
+
+    async def _run_step(self, tasks, name):
+        fn, after = self._steps[name]
+        values = {dep: await tasks[dep] for dep in after}
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(**values)
+        return await asyncio.to_thread(fn, **values)
+
+    async def arun(self):
+        tasks = {}
+        for name in self._steps:
+            tasks[name] = asyncio.ensure_future(self._run_step(tasks, name))
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return dict(zip(tasks, results))
+
+    def run(self):
+        """Run every step on the shared loop and return {name: result}."""
+        return run(self.arun())
@@ -0,0 +1,55 @@
+from answer_cache import AnswerCache
+
+
+def test_near_duplicate_question_is_answered_from_cache(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite3", threshold=0.9)
+    cache.add([1.0, 0.0], "Claims are settled within 7 days.", "v1")
+
+    assert cache.lookup([0.99, 0.05], "v1") == "Claims are settled within 7 days."
+    assert cache.lookup([0.0, 1.0], "v1") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_store_version_change_drops_answers(tmp_path):
+    path = tmp_path / "answers.sqlite3"
+    cache = AnswerCache(path, threshold=0.9)
+    cache.add([1.0, 0.0], "old answer", "v1")
+
+    assert cache.lookup([1.0, 0.0], "v2") is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["store_version"] == "v2"
+    # The rows are gone from disk too, so switching back does not revive them.
+    assert AnswerCache(path, threshold=0.9).lookup([1.0, 0.0], "v1") is None
+
+
+def test_answers_persist_for_the_same_version(tmp_path):
+    path = tmp_path / "answers.sqlite3"
+    AnswerCache(path, threshold=0.9).add([1.0, 0.0], "answer", None)
+
+    assert AnswerCache(path, threshold=0.9).lookup([1.0, 0.0], None) == "answer"
+
+
+def test_answers_expire_after_ttl(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("time.time", lambda: clock[0])
+    cache = AnswerCache(tmp_path / "answers.sqlite3", threshold=0.9, ttl=60)
+    cache.add([1.0, 0.0], "answer", "v1")
+    clock[0] += 30
+    cache.add([0.0, 1.0], "newer answer", "v1")
+
+    clock[0] += 31
+    assert cache.lookup([1.0, 0.0], "v1") is None
+    assert cache.lookup([0.0, 1.0], "v1") == "newer answer"
+    assert cache.stats()["entries"] == 1
+
+
+def test_oldest_answers_are_dropped_past_max_entries(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite3", threshold=0.9, max_entries=2)
+    cache.add([1.0, 0.0, 0.0], "first", "v1")
+    cache.add([0.0, 1.0, 0.0], "second", "v1")
+    cache.add([0.0, 0.0, 1.0], "third", "v1")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup([1.0, 0.0, 0.0], "v1") is None
+    assert cache.lookup([0.0, 0.0, 1.0], "v1") == "third"
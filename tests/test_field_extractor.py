@@ -0,0 +1,57 @@
+import json
+from types import SimpleNamespace
+
+from extraction import extract_claim
+from field_extractor import extract_field, extract_fields
+
+ONE_LINE_HEALTH = (
+    "Patient Name: Asha Sharma Policy Number: HLT123456 Date of birth: 1990-04-12 "
+    "Date of treatment: 2025-02-03. Please find my health claim attached."
+)
+
+
+def test_name_stops_at_sentence_end():
+    body = "The owner name is John Smith. Vehicle number is MH12AB1234."
+    assert extract_field("owner_name", [body])[0] == "John Smith"
+
+
+def test_name_stops_at_next_label_on_one_line():
+    assert extract_field("patient_name", [ONE_LINE_HEALTH])[0] == "Asha Sharma"
+
+
+def test_name_stops_at_line_end():
+    assert extract_field("patient_name", ["Patient Name: Ravi Kumar\nPolicy Number: HLT123456"])[0] == "Ravi Kumar"
+
+
+def test_single_source_name_does_not_skip_llm():
+    prefilled = extract_fields(ONE_LINE_HEALTH, ["Hospital bill"])
+    assert prefilled.fields["policy_number"] == "HLT123456"
+    assert prefilled.unconfirmed == {"patient_name"}
+    assert not prefilled.complete
+
+
+def test_name_confirmed_by_attachment_completes():
+    prefilled = extract_fields(ONE_LINE_HEALTH, ["Discharge summary\nPatient name: Asha Sharma\n"])
+    assert prefilled.unconfirmed == set()
+    assert prefilled.complete
+
+
+def test_conflicting_names_are_left_to_llm():
+    prefilled = extract_fields(ONE_LINE_HEALTH, ["Patient name: Asha Verma\n"])
+    assert "patient_name" not in prefilled.fields
+
+
+def test_llm_values_win_over_regex_prefill():
+    reply = {
+        "policy_type": "health",
+        "intent": "claim",
+        "fields": {"patient_name": "Asha Sharma", "policy_number": None},
+        "documents": [],
+    }
+    llm = SimpleNamespace(invoke=lambda prompt: SimpleNamespace(content=json.dumps(reply)))
+    known = {"patient_name": "Asha Sharma Policy Number", "policy_number": "HLT123456"}
+
+    extraction = extract_claim(llm, ONE_LINE_HEALTH, "", [], known_fields=known)
+
+    assert extraction.fields["patient_name"] == "Asha Sharma"
+    assert extraction.fields["policy_number"] == "HLT123456"
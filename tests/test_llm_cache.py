@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+from llm_cache import CachedLLM, LLMCache, placeholder
+
+PROMPT = f"Write a short confirmation for claim {placeholder('claim_id')}."
+
+
+class FakeLLM:
+    model = "fake"
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    def invoke(self, prompt):
+        self.calls.append(prompt)
+        return SimpleNamespace(content=self.content)
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+def test_memory_lru_evicts_least_recently_used(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite3", max_memory_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.stats()["evictions"] == 1
+    # "b" fell out of memory but is still on disk.
+    assert cache.get("b") == "B"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_keeps_most_recently_used_entries(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite3", max_memory_entries=1, max_disk_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.set("c", "C")
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "B"
+    assert cache.get("c") == "C"
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("time.time", lambda: clock[0])
+    cache = LLMCache(tmp_path / "llm.sqlite3", ttl=60)
+    cache.set("a", "A")
+    clock[0] += 30
+    assert cache.get("a") == "A"
+
+    clock[0] += 31
+    assert cache.get("a") is None
+    assert LLMCache(tmp_path / "llm.sqlite3", ttl=60).get("a") is None
+
+
+def test_placeholders_share_one_cached_generation(tmp_path):
+    llm = FakeLLM(f"Claim {placeholder('claim_id')} received.")
+    cached = CachedLLM(llm, LLMCache(tmp_path / "llm.sqlite3"))
+
+    first = cached.invoke(PROMPT, {"claim_id": "CLM-1"})
+    second = cached.invoke(PROMPT, {"claim_id": "CLM-2"})
+
+    assert first.content == "Claim CLM-1 received."
+    assert second.content == "Claim CLM-2 received."
+    assert llm.calls == [PROMPT]
+
+
+def test_completion_without_placeholder_is_returned_uncached(tmp_path):
+    llm = FakeLLM("Your claim was received.")
+    cached = CachedLLM(llm, LLMCache(tmp_path / "llm.sqlite3"))
+
+    assert cached.invoke(PROMPT, {"claim_id": "CLM-1"}).content == "Your claim was received."
+    assert len(llm.calls) == 1
+    cached.invoke(PROMPT, {"claim_id": "CLM-2"})
+    assert len(llm.calls) == 2
+
+
+def test_ainvoke_uses_the_same_cache(tmp_path):
+    llm = FakeLLM(f"Claim {placeholder('claim_id')} received.")
+    cached = CachedLLM(llm, LLMCache(tmp_path / "llm.sqlite3"))
+
+    first = asyncio.run(cached.ainvoke(PROMPT, {"claim_id": "CLM-1"}))
+    second = cached.invoke(PROMPT, {"claim_id": "CLM-2"})
+
+    assert first.content == "Claim CLM-1 received."
+    assert second.content == "Claim CLM-2 received."
+    assert len(llm.calls) == 1
@@ -0,0 +1,104 @@
+import pytest
+
+from resilience import Backend, CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+def test_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket._take() == 0
+    assert bucket._take() == 0
+    assert 0 < bucket._take() <= 0.1
+
+
+def test_zero_rate_disables_limiting():
+    bucket = TokenBucket(rate=0, burst=1)
+    bucket.pause(30)
+    assert all(bucket._take() == 0 for _ in range(100))
+
+
+def test_throttling_halves_rate_and_success_restores_it():
+    bucket = TokenBucket(rate=10, burst=1)
+    bucket.throttled()
+    assert bucket.rate == 5
+    for _ in range(5):
+        bucket.throttled()
+    assert bucket.rate == 1
+
+    bucket.succeeded()
+    assert bucket.rate == pytest.approx(1.5)
+    for _ in range(50):
+        bucket.succeeded()
+    assert bucket.rate == 10
+
+
+def test_pause_makes_callers_wait_out_retry_after():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.pause(2)
+    assert bucket._take() == pytest.approx(2.1, abs=0.01)
+
+
+def test_circuit_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", threshold=3, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_closes_or_reopens_circuit():
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    breaker.record_failure()
+    assert breaker.is_open
+
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_backend_retries_transient_errors():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("reset")
+        return "ok"
+
+    backend = Backend("test", rate=0, burst=1, max_attempts=3, base_delay=0, max_delay=0)
+    assert backend.call(flaky) == "ok"
+    assert len(calls) == 3
+
+
+def test_backend_does_not_retry_non_idempotent_calls():
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise ConnectionError("reset")
+
+    backend = Backend("test", rate=0, burst=1, max_attempts=3, base_delay=0, max_delay=0)
+    with pytest.raises(ConnectionError):
+        backend.call(send, idempotent=False)
+    assert len(calls) == 1
+
+
+def test_backend_fails_fast_while_circuit_is_open():
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    backend = Backend("test", rate=0, burst=1, breaker=breaker)
+    with pytest.raises(CircuitOpenError):
+        backend.call(lambda: "never called")
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from step_graph import StepGraph
+
+
+def test_steps_receive_dependency_results():
+    async def summary():
+        return "summary"
+
+    def description(summary):
+        return f"{summary} + description"
+
+    async def issue(description, confirmation):
+        return (description, confirmation)
+
+    graph = (
+        StepGraph()
+        .add("confirmation", lambda: "mail")
+        .add("summary", summary)
+        .add("description", description, after=("summary",))
+        .add("issue", issue, after=("description", "confirmation"))
+    )
+
+    assert graph.run() == {
+        "confirmation": "mail",
+        "summary": "summary",
+        "description": "summary + description",
+        "issue": ("summary + description", "mail"),
+    }
+
+
+def test_independent_steps_run_concurrently():
+    both_started = threading.Barrier(2, timeout=5)
+
+    def step():
+        both_started.wait()
+        return True
+
+    graph = StepGraph().add("a", step).add("b", step)
+    assert graph.run() == {"a": True, "b": True}
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        StepGraph().add("issue", lambda description: description, after=("description",))
+
+
+def test_failing_step_raises_and_skips_dependents():
+    ran = []
+
+    def summary():
+        raise RuntimeError("LLM down")
+
+    def description(summary):
+        ran.append("description")
+
+    graph = StepGraph().add("summary", summary).add("description", description, after=("summary",))
+    with pytest.raises(RuntimeError, match="LLM down"):
+        graph.run()
+    assert ran == []
@@ -0,0 +1,86 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from config import SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_ROUNDS, SUMMARY_WORKERS, TOKEN_ENCODING
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    import tiktoken
+
+    return tiktoken.get_encoding(TOKEN_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+def split_tokens(text: str, chunk_tokens: int):
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    return [encoding.decode(tokens[start:start + chunk_tokens]) for start in range(0, len(tokens), chunk_tokens)]
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def fit_attachments(attachments, budget: int):
+    """Share a token budget across (name, text) attachments, truncating the longest first.
+
+    Document headers are what identifies a document, so each text keeps its
+    beginning; short attachments keep everything and give their unused share
+    to the long ones.
+    """
+    if not attachments:
+        return []
+    sizes = [count_tokens(text) for _, text in attachments]
+    if sum(sizes) <= budget:
+        return list(attachments)
+
+    remaining = budget
+    limits = {}
+    for position in sorted(range(len(attachments)), key=lambda i: sizes[i]):
+        share = remaining // (len(attachments) - len(limits))
+        limits[position] = min(sizes[position], share)
+        remaining -= limits[position]
+    return [(name, truncate_tokens(text, limits[i])) for i, (name, text) in enumerate(attachments)]
+
+
+def build_map_prompt(chunk: str) -> str:
+    return f"""
+    Summarize the following excerpt from insurance claim documents for a claim handler.
+    Keep every name, identifier, policy/vehicle/bill number, date, amount, diagnosis and document type exactly as written.
+    Drop boilerplate, repeated headers and legal fine print.
+    Write plain text only, no Markdown.
+
+    Excerpt:
+    {chunk}
+    """
+
+
+def summarize_to_budget(chat, text: str, budget: int, chunk_tokens=SUMMARY_CHUNK_TOKENS, workers=SUMMARY_WORKERS) -> str:
+    """Map-reduce summarize text until it fits in budget tokens.
+
+    Chunks are summarized in parallel; the joined summaries are reduced again
+    if still too long, and truncated as a last resort after SUMMARY_MAX_ROUNDS.
+    """
+    for round_number in range(1, SUMMARY_MAX_ROUNDS + 1):
+        size = count_tokens(text)
+        if size <= budget:
+            return text
+        chunks = split_tokens(text, chunk_tokens)
+        logger.info(f"Summarizing {size} tokens in {len(chunks)} chunk(s) (round {round_number})")
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            summarize = metrics.bind(lambda chunk: chat.invoke(build_map_prompt(chunk)).content)
+            summaries = list(executor.map(summarize, chunks))
+        text = "\n".join(summaries)
+    return truncate_tokens(text, budget)
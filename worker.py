@@ -0,0 +1,202 @@
+import json
+import logging
+import signal
+import sys
+import time
+
+import schedule
+
+from config import BATCH_INTERVAL_SECONDS, MAIL_DISPATCH_IN_PROCESS, METRICS_PORT, RAG_MODE, WORKER_LOCK_ID
+from db import connection, ensure_migrated
+from doc_classifier import DECIDED_BY_RULES
+from insurance_test import process_claims, process_jira_updates
+from metrics import metrics, start_http_server
+from resilience import snapshot as backend_snapshot
+from services import registry
+
+logger = logging.getLogger(__name__)
+
+_stopping = False
+_primary = False
+
+
+def acquire_worker_lock(conn):
+    """Take the session-level lock that makes this the primary worker.
+
+    Any number of workers process claim jobs; only the primary also polls
+    Jira, so status mails are not sent twice.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", (WORKER_LOCK_ID,))
+        acquired = cursor.fetchone()[0]
+    conn.commit()
+    return acquired
+
+
+def ensure_primary(conn):
+    """Try for the worker lock unless this worker already holds it.
+
+    Called before every batch, so a surviving worker takes over Jira polling
+    when the primary exits. pg_try_advisory_lock stacks, so it is not taken
+    twice.
+    """
+    global _primary
+    if not _primary:
+        _primary = acquire_worker_lock(conn)
+        if _primary:
+            logger.info("This worker is now primary and polls Jira.")
+    return _primary
+
+
+def worker_services():
+    """Services a batch uses, in dependency order, for pre-warming at startup.
+
+    The O365 account is not in the list: it may need interactive sign-in, so
+    main() builds it in the foreground first.
+    """
+    names = ["chat", "jira", "embedding_model", "vectorstore", "policy_context", "answer_cache", "pdf_pool"]
+    if RAG_MODE == "summarize":
+        names.append("qa_chain")
+    if MAIL_DISPATCH_IN_PROCESS:
+        names.append("mail_dispatcher")
+    return names
+
+
+def start_run():
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("INSERT INTO batch_runs DEFAULT VALUES RETURNING id")
+        run_id = cursor.fetchone()[0]
+        conn.commit()
+    return run_id
+
+
+def finish_run(run_id, status, results, logs, stats, error=None):
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE batch_runs SET
+                finished_at = now(),
+                status = %s,
+                results = %s::jsonb,
+                logs = %s::jsonb,
+                stats = %s::jsonb,
+                error = %s
+            WHERE id = %s
+            """,
+            (status, json.dumps(results, default=str), json.dumps(logs), json.dumps(stats, default=str), error, run_id)
+        )
+        conn.commit()
+
+
+def run_batch(lock_conn=None):
+    """Run one batch and record it in batch_runs.
+
+    Jira is polled only while this worker holds the worker lock on lock_conn
+    (always, without a lock connection).
+
+    Never raises: the schedule library does not catch job exceptions, so an
+    error escaping here (e.g. Postgres unreachable) would stop the worker.
+    """
+    run_id = None
+    metrics.start_batch()
+    started = time.monotonic()
+    logs = []
+    results = []
+    stats = {}
+    status = "succeeded"
+    error = None
+    llm_calls_saved = 0
+    try:
+        primary = lock_conn is None or ensure_primary(lock_conn)
+        run_id = start_run()
+        try:
+            # Transient backend errors are retried per call (resilience.py) and
+            # failed messages per job (job_queue.py), so the batch runs once.
+            claim_results = process_claims()
+            logs.append(f"Claims processed: {len(claim_results)}")
+            results.extend(claim_results)
+            llm_calls_saved = sum(1 for entry in claim_results if entry.get("extracted_by") == DECIDED_BY_RULES)
+            logs.append(f"LLM extraction calls saved by rule-based extraction: {llm_calls_saved}")
+        except Exception as e:
+            logger.exception(f"Batch {run_id}: claims processing failed: {e}")
+            logs.append(f"Error processing claims: {e}")
+            status, error = "failed", str(e)
+
+        if primary:
+            try:
+                jira_results = process_jira_updates()
+                results.extend(jira_results)
+                logs.append("Jira updates processed and customer emails queued")
+            except Exception as e:
+                logger.exception(f"Batch {run_id}: Jira updates failed: {e}")
+                logs.append(f"Error processing Jira updates: {e}")
+                status, error = "failed", error or str(e)
+
+        stats = {
+            "seconds": round(time.monotonic() - started, 2),
+            "llm_calls_saved": llm_calls_saved,
+            "service_init_seconds": {name: round(seconds, 2) for name, seconds in registry.init_times().items()},
+        }
+        if registry.is_initialized("chat"):
+            stats["llm_cache"] = registry.get("chat").cache.stats()
+        if registry.is_initialized("answer_cache"):
+            stats["answer_cache"] = registry.get("answer_cache").stats()
+        stats["backends"] = backend_snapshot()
+        stats.update(metrics.batch_snapshot())
+    except Exception as e:
+        logger.exception(f"Batch {run_id} failed: {e}")
+        logs.append(f"Batch failed: {e}")
+        status, error = "failed", error or str(e)
+
+    stats.setdefault("seconds", round(time.monotonic() - started, 2))
+    if run_id is not None:
+        try:
+            finish_run(run_id, status, results, logs, stats, error)
+        except Exception as e:
+            logger.exception(f"Could not record batch {run_id}: {e}")
+    logger.info(f"Batch {run_id} {status} in {stats['seconds']}s with {len(results)} result(s)")
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    logger.info(f"Received signal {signum}, stopping after the current batch")
+    _stopping = True
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    ensure_migrated()
+    with connection() as lock_conn:
+        if not ensure_primary(lock_conn):
+            logger.info("Another worker is primary; this worker only processes claim jobs for now.")
+
+        signal.signal(signal.SIGTERM, _request_stop)
+        signal.signal(signal.SIGINT, _request_stop)
+        registry.get("account")
+        registry.prewarm(worker_services(), background=True)
+        if METRICS_PORT:
+            try:
+                start_http_server(METRICS_PORT)
+            except OSError as e:
+                # Usually a second worker on this host; it still processes claims.
+                logger.warning(f"Not serving metrics on port {METRICS_PORT} ({e}); set METRICS_PORT per worker or 0")
+
+        schedule.every(BATCH_INTERVAL_SECONDS).seconds.do(run_batch, lock_conn)
+        try:
+            schedule.run_all()
+            while not _stopping:
+                if lock_conn.closed:
+                    logger.error("Lost the worker lock connection; exiting.")
+                    return 1
+                schedule.run_pending()
+                time.sleep(1)
+        finally:
+            if _primary and not lock_conn.closed:
+                with lock_conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (WORKER_LOCK_ID,))
+                lock_conn.commit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())